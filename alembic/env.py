@@ -13,6 +13,8 @@ from src.sales import models as sales_models # noqa
 from src.admin import models as admin_models # noqa
 from src.tickets import models as ticket_models # noqa
 from src.articles import models as article_models # noqa
+from src.s3 import models as s3_models # noqa
+from src.related import models as related_models # noqa
 
 from alembic import context
 
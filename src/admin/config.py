@@ -5,5 +5,17 @@ class AdminConfig(BaseSettings):
     IMAGE_SIZE_LIMIT: int
     IMAGE_FORMAT_LIMIT: str
     MAXIMUM_IMAGES: int
+    BULK_IMPORT_CHUNK_SIZE: int = 500
+    BULK_IMPORT_UPLOAD_CONCURRENCY: int = 8
+    # Longest side in pixels of each generated webp variant.
+    IMAGE_VARIANT_SIZES: dict[str, int] = {"thumbnail": 150, "card": 400, "full": 1200}
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_PROCESS_WORKERS: int = 2
+    # Failed images are queued again until they failed this many times.
+    IMAGE_PROCESS_MAX_ATTEMPTS: int = 5
+    # How long an issued presigned upload key can still be confirmed.
+    UPLOAD_CONFIRM_TTL_SEC: int = 3600
+    # Range of /admin/ticket-stats/ when no start date is given.
+    TICKET_STATS_DEFAULT_DAYS: int = 30
 
 admin_config = AdminConfig() # type: ignore
@@ -80,6 +80,30 @@ class ImageFormatExc(HTTPException):
         self.detail = f"Image ext must be in {admin_config.IMAGE_FORMAT_LIMIT}!"
 
 
+class UploadKeyNotIssued(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Upload keys are not issued or expired!"
+
+
+class ImageNotUploaded(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Images are not uploaded to the storage yet!"
+
+
+class InvalidManifest(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Manifest must be a csv or xlsx file with a header row!"
+
+
+class InvalidImageArchive(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Images must be uploaded as a zip file!"
+
+
 class ProductNotFound(HTTPException):
     def __init__(self) -> None:
         self.status_code = status.HTTP_404_NOT_FOUND
@@ -150,3 +174,15 @@ class UniqueConstraintGlossary(HTTPException):
     def __init__(self) -> None:
         self.status_code = status.HTTP_409_CONFLICT
         self.detail = "Term and article_id are unique together!"
+
+
+class InvalidDateRange(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Start of the date range must not be after its end!"
+
+
+class OrphanReportNotReady(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_404_NOT_FOUND
+        self.detail = "The orphaned objects collector hasn't finished a run yet!"
@@ -1,4 +1,5 @@
 from typing import Annotated
+from datetime import date
 from redis.asyncio import Redis
 from fastapi import APIRouter, status, UploadFile, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, async_sessionmaker
@@ -7,6 +8,15 @@ from src.database import get_session, get_redis, get_engine
 from src.pagination import PaginatedResponse, pagination_query, PaginationQuerySchema
 from src.admin import schemas
 from src.admin import service
+from src.admin import exceptions
+from src.admin.types import (
+    BulkImportReport,
+    ImageUploadUrlResponse,
+    StatsInterval,
+    TicketStatsResponse
+)
+from src.s3.service import last_orphan_report
+from src.s3.types import OrphanReport
 from src.products.types import CategoryId, ProductId, SerialNumber, CommentId
 from src.auth.dependencies import is_admin
 from src.tickets.types import TicketId
@@ -317,12 +327,14 @@ async def unassigned_category_attribute(
 )
 async def create_product(
     payload: schemas.ProductIn,
-    images: list[UploadFile],
     is_admin: Annotated[bool, Depends(is_admin)],
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    images: list[UploadFile] = []
 ) -> dict:
     await service.create_product(
         session=session,
+        redis=redis,
         payload=payload,
         images=images
     )
@@ -337,9 +349,11 @@ async def activate_product(
     product_id: ProductId,
     is_admin: Annotated[bool, Depends(is_admin)],
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> None:
     await service.activate_product(
         session=session,
+        redis=redis,
         product_id=product_id
     )
 
@@ -352,9 +366,11 @@ async def deactivate_product(
     product_id: ProductId,
     is_admin: Annotated[bool, Depends(is_admin)],
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> None:
     await service.deactivate_product(
         session=session,
+        redis=redis,
         product_id=product_id
     )
 
@@ -367,9 +383,11 @@ async def delete_product(
     product_id: ProductId,
     is_admin: Annotated[bool, Depends(is_admin)],
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> None:
     await service.delete_product(
         session=session,
+        redis=redis,
         product_id=product_id
     )
 
@@ -426,6 +444,99 @@ async def delete_comment(
         comment_id=comment_id
     )
 
+# ==================== Direct upload routes ==================== #
+
+@router.post(
+    "/image-upload-urls/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=list[schemas.ImageUploadUrl]
+)
+async def image_upload_urls(
+    payload: schemas.ImageUploadUrlsIn,
+    is_admin: Annotated[bool, Depends(is_admin)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> list[ImageUploadUrlResponse]:
+    return await service.issue_image_upload_urls(
+        redis=redis,
+        payload=payload
+    )
+
+
+@router.post(
+    "/confirm-product-images/{product_id}/",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def confirm_product_images(
+    product_id: ProductId,
+    payload: schemas.ConfirmImagesIn,
+    is_admin: Annotated[bool, Depends(is_admin)],
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> None:
+    await service.confirm_product_images(
+        session=session,
+        redis=redis,
+        product_id=product_id,
+        payload=payload
+    )
+
+
+@router.post(
+    "/confirm-article-images/{article_id}/",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def confirm_article_images(
+    article_id: ArticleId,
+    payload: schemas.ConfirmImagesIn,
+    is_admin: Annotated[bool, Depends(is_admin)],
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> None:
+    await service.confirm_article_images(
+        session=session,
+        redis=redis,
+        article_id=article_id,
+        payload=payload
+    )
+
+@router.get(
+    "/s3-orphans-report/",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.OrphanReport
+)
+async def s3_orphans_report(
+    is_admin: Annotated[bool, Depends(is_admin)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> OrphanReport:
+    """
+    Report of the consumer's last orphaned object collector run,
+    the bucket is too big to walk inside a request.
+    """
+    if (report := await last_orphan_report(redis)) is None:
+        raise exceptions.OrphanReportNotReady
+    return report
+
+# ==================== Bulk import routes ==================== #
+
+@router.post(
+    "/bulk-import-products/",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.BulkImportReport
+)
+async def bulk_import_products(
+    manifest: UploadFile,
+    images: UploadFile,
+    is_admin: Annotated[bool, Depends(is_admin)],
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> BulkImportReport:
+    return await service.bulk_import_products(
+        manifest=manifest,
+        images=images,
+        session=session,
+        redis=redis
+    )
+
 # ==================== Guaranty routes ==================== #
 
 @router.post(
@@ -464,6 +575,27 @@ async def list_tickets(
     return result
 
 
+@router.get(
+    "/ticket-stats/",
+    status_code=status.HTTP_200_OK,
+    response_model=schemas.TicketStats
+)
+async def ticket_stats(
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    is_admin: Annotated[bool, Depends(is_admin)],
+    date_from: Annotated[date | None, Query(alias="from")] = None,
+    date_to: Annotated[date | None, Query(alias="to")] = None,
+    interval: Annotated[StatsInterval, Query()] = "day"
+) -> TicketStatsResponse:
+    result = await service.ticket_stats(
+        session=session,
+        date_from=date_from,
+        date_to=date_to,
+        interval=interval
+    )
+    return result
+
+
 @router.delete(
     "/delete-ticket/{ticket_id}/",
     status_code=status.HTTP_204_NO_CONTENT
@@ -485,9 +617,9 @@ async def delete_ticket(
 )
 async def create_article(
         payload: schemas.ArticleIn,
-        images: list[UploadFile],
         is_admin: Annotated[bool, Depends(is_admin)],
         session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+        images: list[UploadFile] = []
 ) -> dict:
     await service.create_article(
         session=session,
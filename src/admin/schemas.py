@@ -1,8 +1,8 @@
 import json
 
-from typing import Annotated, Self, Any
+from typing import Annotated, Literal, Self, Any
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime
 from pydantic import (
     BaseModel,
     ConfigDict,
@@ -149,6 +149,12 @@ class ProductQuerySearch(CustomBaseModel):
     category__exact: Annotated[str | None, Field(alias="categoryExact")] = None
     brand__exact: Annotated[str | None, Field(alias="brandExact")] = None
     name__contain: Annotated[str | None, Field(alias="nameContain")] = None
+    price__gte: Annotated[Decimal | None, Field(alias="priceGte", ge=0)] = None
+    price__lte: Annotated[Decimal | None, Field(alias="priceLte", ge=0)] = None
+    order_by: Annotated[Literal["newest", "price", "-price"], Field(alias="orderBy")] = "newest"
+    in_stock: Annotated[bool, Field(alias="inStock")] = False
+    # "<name>:<value>" items, products must match all of them.
+    attributes: Annotated[list[str], Field(alias="attribute")] = []
 
     @model_validator(mode="before")
     @classmethod
@@ -157,11 +163,82 @@ class ProductQuerySearch(CustomBaseModel):
             return cls(**json.loads(value))
         return value
 
+    @field_validator("attributes", mode="after")
+    @classmethod
+    def validate_attributes(cls, attributes: list[str]) -> list[str]:
+        for attribute in attributes:
+            if ":" not in attribute:
+                raise ValueError("Attribute filters must be in <name>:<value> format!")
+        return attributes
+
+    @property
+    def attribute_filters(self) -> dict[str, str]:
+        return dict(attribute.split(":", 1) for attribute in self.attributes) # type: ignore
+
+
+class ImageUploadIn(CustomBaseModel):
+    filename: Annotated[str, Field(max_length=250)]
+    content_type: Annotated[str, Field(alias="contentType", pattern=r"^image/[\w.+-]+$")]
+
+
+class ImageUploadUrlsIn(CustomBaseModel):
+    images: Annotated[list[ImageUploadIn], Field(min_length=1)]
+
+
+class ImageUploadUrl(CustomBaseModel):
+    key: str
+    url: str
+    fields: dict[str, str]
+
+
+class ConfirmImagesIn(CustomBaseModel):
+    keys: Annotated[list[str], Field(min_length=1)]
+
+
+class BulkImportRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class BulkImportReport(BaseModel):
+    created: int
+    errors: list[BulkImportRowError]
+
+
+class OrphanReport(BaseModel):
+    dry_run: bool
+    scanned: int
+    orphans: int
+    orphan_bytes: int
+    deleted: int
+    sample_keys: list[str]
+    finished_at: datetime
+
 
 class TicketList(TicketIn):
     id: TicketId
 
 
+class RatingStats(BaseModel):
+    category: str
+    average: float | None
+    distribution: dict[int, int]
+
+
+class TicketTrend(CustomBaseModel):
+    period: date
+    ticket_count: Annotated[int, Field(serialization_alias="ticketCount")]
+    averages: dict[str, float | None]
+
+
+class TicketStats(CustomBaseModel):
+    date_from: Annotated[date, Field(serialization_alias="from")]
+    date_to: Annotated[date, Field(serialization_alias="to")]
+    ticket_count: Annotated[int, Field(serialization_alias="ticketCount")]
+    ratings: list[RatingStats]
+    trend: list[TicketTrend]
+
+
 class Tag(BaseModel):
     name: Annotated[str, Field(max_length=200)]
 
@@ -1,11 +1,19 @@
+import os
 import logging
 import asyncio
+import zipfile
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
 from io import BytesIO
+from datetime import date, datetime, timedelta, timezone
+from collections import defaultdict
+from concurrent.futures import Executor
+from uuid import uuid4
 from openpyxl import load_workbook # type: ignore
+from typing import BinaryIO
 from fastapi import UploadFile
+from pydantic import ValidationError
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, async_sessionmaker
 from sqlalchemy.exc import IntegrityError
@@ -14,12 +22,27 @@ from sqlalchemy.dialects.postgresql import insert as postgres_upsert
 from src.admin import schemas
 from src.admin import exceptions
 from src.admin.models import Guaranty
-from src.admin.types import AdminProductDetailResponse, ExcelEntityTypes
+from src.admin.config import admin_config
+from src.admin.types import (
+    AdminProductDetailResponse,
+    ExcelEntityTypes,
+    BulkImportReport,
+    BulkImportRowError,
+    ImageUploadUrlResponse,
+    StatsInterval,
+    TicketStatsResponse
+)
 from src.admin.utils import (
     validate_images_and_return_unique_image_names,
-    create_unique_excel_name
+    create_unique_excel_name,
+    calculate_effective_price,
+    article_preview,
+    read_manifest_rows,
+    image_variant_key,
+    generate_image_variants
 )
 from src.pagination import paginate
+from src.http_cache import CATALOG, bump_cache_version
 from src.products.types import (
     CategoryId,
     BrandId,
@@ -37,8 +60,20 @@ from src.products.models import (
     AttributeValue,
     Comment
 )
-from src.s3.utils import upload_to_s3, delete_from_s3
-from src.tickets.models import Ticket
+from src.products.service import (
+    mark_facets_dirty,
+    decrement_comment_count as decrement_product_comment_count
+)
+from src.s3.service import enqueue_s3_deletes, enqueue_upload_checks
+from src.related.service import delete_related_items
+from src.s3.utils import (
+    upload_to_s3,
+    get_obj_from_s3,
+    generate_presigned_upload,
+    get_obj_metadata_from_s3
+)
+from src.tickets.models import Ticket, TicketRatingRollup
+from src.tickets.service import RATING_COLUMNS, apply_rating_rollup
 from src.tickets.types import TicketId
 from src.articles.models import (
     Tag,
@@ -50,9 +85,13 @@ from src.articles.models import (
 )
 from src.articles.types import ArticleId, GlossaryId, ArticleCommentId
 from src.articles.exceptions import ArticleNotFound
+from src.articles.service import decrement_comment_count as decrement_article_comment_count
 
 logger = logging.getLogger("admin")
 
+IMAGES_QUEUE_KEY = "images:pending"
+IMAGE_ATTEMPTS_KEY = "images:attempts"
+
 # ==================== Brand service ==================== #
 
 async def create_brand(
@@ -471,6 +510,7 @@ async def create_product(
         payload: schemas.ProductIn,
         images: list[UploadFile],
         session: async_sessionmaker[AsyncSession],
+        redis: Redis
 ) -> None:
     image_unique_names = await validate_images_and_return_unique_image_names(images)
 
@@ -497,6 +537,11 @@ async def create_product(
                     Product.price: payload.price,
                     Product.discount: payload.discount if payload.discount else None,
                     Product.expiry_discount: payload.expiry_discount if payload.expiry_discount else None,
+                    Product.effective_price: calculate_effective_price(
+                        price=payload.price,
+                        discount=payload.discount,
+                        expiry_discount=payload.expiry_discount
+                    ),
                     Product.brand_id: brand_id,
                     Product.category_id: category_id
                 }
@@ -521,7 +566,11 @@ async def create_product(
                     ]
                 )
                 await conn.execute(attribute_query)
-            await conn.execute(image_query)
+            if image_unique_names:
+                await conn.execute(image_query)
+                await enqueue_upload_checks(
+                    conn=conn, keys=list(image_unique_names), action="verify_product_image"
+                )
     except exceptions.CategoryNotFound as ex:
         logger.warning(ex)
         raise exceptions.CategoryNotFound
@@ -539,24 +588,28 @@ async def create_product(
         if "fk_attributevalues_product_id_products" in str(ex):
             raise exceptions.ProductNotFound
 
+    await mark_facets_dirty(redis, category_id)
     await asyncio.gather(*[
         upload_to_s3(file=image_file, unique_filename=image_unique_name)
         for image_unique_name, image_file in image_unique_names.items()
     ])
+    if image_unique_names:
+        await redis.lpush(IMAGES_QUEUE_KEY, *image_unique_names)
 
 
 async def activate_product(
         session: async_sessionmaker[AsyncSession],
+        redis: Redis,
         product_id: ProductId
 ) -> None:
     query = sa.update(Product).where(Product.id==product_id).values(
         {
             Product.is_active: True
         }
-    ).returning(Product.id)
+    ).returning(Product.id, Product.category_id)
     try:
         async with session.begin() as conn:
-            result: ProductId | None = await conn.scalar(query)
+            result = (await conn.execute(query)).first()
             if result is None:
                 raise exceptions.ProductNotFound
     except exceptions.ProductNotFound as ex:
@@ -564,20 +617,23 @@ async def activate_product(
         raise exceptions.ProductNotFound
     except IntegrityError as ex:
         logger.warning(ex)
+        return
+    await mark_facets_dirty(redis, result.category_id)
 
 
 async def deactivate_product(
         session: async_sessionmaker[AsyncSession],
+        redis: Redis,
         product_id: ProductId
 ) -> None:
     query = sa.update(Product).where(Product.id==product_id).values(
         {
             Product.is_active: False
         }
-    ).returning(Product.id)
+    ).returning(Product.id, Product.category_id)
     try:
         async with session.begin() as conn:
-            result: ProductId | None = await conn.scalar(query)
+            result = (await conn.execute(query)).first()
             if result is None:
                 raise exceptions.ProductNotFound
     except exceptions.ProductNotFound as ex:
@@ -585,24 +641,37 @@ async def deactivate_product(
         raise exceptions.ProductNotFound
     except IntegrityError as ex:
         logger.warning(ex)
+        return
+    await mark_facets_dirty(redis, result.category_id)
 
 
 async def delete_product(
         session: async_sessionmaker[AsyncSession],
+        redis: Redis,
         product_id: ProductId
 ) -> None:
     image_query = sa.select(ProductImage.url).where(
         ProductImage.product_id==product_id
     )
-    query = sa.delete(Product).where(Product.id==product_id)
+    query = sa.delete(Product).where(Product.id==product_id).returning(Product.category_id)
+    category_id: CategoryId | None = None
     try:
         async with session.begin() as conn:
             result = list((await conn.scalars(image_query)).all())
-            await conn.execute(query)
+            category_id = await conn.scalar(query)
+            await delete_related_items(conn=conn, kind="product", item_id=product_id)
+            await enqueue_s3_deletes(
+                conn=conn,
+                keys=[
+                    key for image_name in result for key in [
+                        image_name,
+                        *[image_variant_key(image_name, variant) for variant in admin_config.IMAGE_VARIANT_SIZES]
+                    ]
+                ]
+            )
     except Exception as ex:
         logger.warning(ex)
-    for image_name in result:
-        await delete_from_s3(image_name)
+    await mark_facets_dirty(redis, category_id)
 
 
 async def list_products(
@@ -738,13 +807,411 @@ async def delete_comment(
         comment_id: CommentId,
         session: async_sessionmaker[AsyncSession],
 ) -> None:
-    query = sa.delete(Comment).where(Comment.id==comment_id)
+    query = sa.delete(Comment).where(Comment.id==comment_id).returning(Comment.product_id)
     try:
         async with session.begin() as conn:
-            await conn.execute(query)
+            product_id: ProductId | None = await conn.scalar(query)
+            await decrement_product_comment_count(conn=conn, product_id=product_id)
     except IntegrityError as ex:
         logger.warning(ex)
 
+# ==================== Direct upload service ==================== #
+
+def upload_key(unique_filename: str) -> str:
+    return f"upload:{unique_filename}"
+
+
+async def issue_image_upload_urls(
+        redis: Redis,
+        payload: schemas.ImageUploadUrlsIn
+) -> list[ImageUploadUrlResponse]:
+    """
+    Presigned POSTs for uploading images straight to s3, the
+    issued keys are remembered so only they can be confirmed later.
+    """
+    if len(payload.images) > admin_config.MAXIMUM_IMAGES:
+        raise exceptions.MaximumImageNumberExc
+    allowed_formats = {
+        image_format.strip().lower().lstrip(".")
+        for image_format in admin_config.IMAGE_FORMAT_LIMIT.split(",")
+    }
+    image_exts = [os.path.splitext(image.filename)[1].lower() for image in payload.images]
+    if any(image_ext.lstrip(".") not in allowed_formats for image_ext in image_exts):
+        raise exceptions.ImageFormatExc
+
+    uploads: list[ImageUploadUrlResponse] = []
+    for image, image_ext in zip(payload.images, image_exts):
+        unique_filename = f"{uuid4()}{image_ext}"
+        presigned = await generate_presigned_upload(
+            unique_filename=unique_filename,
+            content_type=image.content_type,
+            max_size=admin_config.IMAGE_SIZE_LIMIT * 1024
+        )
+        uploads.append({
+            "key": unique_filename,
+            "url": presigned["url"],
+            "fields": presigned["fields"]
+        })
+    async with redis.pipeline(transaction=False) as pipe:
+        for upload in uploads:
+            pipe.set(name=upload_key(upload["key"]), value=1, ex=admin_config.UPLOAD_CONFIRM_TTL_SEC)
+        await pipe.execute()
+    return uploads
+
+
+async def verify_uploaded_images(
+        redis: Redis,
+        keys: list[str]
+) -> None:
+    if len(keys) > admin_config.MAXIMUM_IMAGES:
+        raise exceptions.MaximumImageNumberExc
+    if not all(await redis.mget([upload_key(key) for key in keys])):
+        raise exceptions.UploadKeyNotIssued
+    uploaded_objects = await asyncio.gather(*[
+        get_obj_metadata_from_s3(filename=key) for key in keys
+    ])
+    if not all(uploaded_objects):
+        raise exceptions.ImageNotUploaded
+
+
+async def confirm_product_images(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        product_id: ProductId,
+        payload: schemas.ConfirmImagesIn
+) -> None:
+    """
+    Attaching images uploaded with presigned urls to the product,
+    app workers only handle their keys, never the bytes.
+    """
+    keys = list(dict.fromkeys(payload.keys))
+    await verify_uploaded_images(redis=redis, keys=keys)
+    count_query = sa.select(sa.func.count()).select_from(ProductImage).where(
+        ProductImage.product_id==product_id
+    )
+    try:
+        async with session.begin() as conn:
+            images_count: int = await conn.scalar(count_query) # type: ignore
+            if images_count + len(keys) > admin_config.MAXIMUM_IMAGES:
+                raise exceptions.MaximumImageNumberExc
+            await conn.execute(
+                sa.insert(ProductImage),
+                [{"product_id": product_id, "url": key} for key in keys]
+            )
+    except exceptions.MaximumImageNumberExc as ex:
+        logger.warning(ex)
+        raise exceptions.MaximumImageNumberExc
+    except IntegrityError as ex:
+        logger.warning(ex)
+        raise exceptions.ProductNotFound
+    await redis.delete(*[upload_key(key) for key in keys])
+    await redis.lpush(IMAGES_QUEUE_KEY, *keys)
+
+
+async def confirm_article_images(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        article_id: ArticleId,
+        payload: schemas.ConfirmImagesIn
+) -> None:
+    keys = list(dict.fromkeys(payload.keys))
+    await verify_uploaded_images(redis=redis, keys=keys)
+    count_query = sa.select(sa.func.count()).select_from(ArticleImage).where(
+        ArticleImage.article_id==article_id
+    )
+    try:
+        async with session.begin() as conn:
+            images_count: int = await conn.scalar(count_query) # type: ignore
+            if images_count + len(keys) > admin_config.MAXIMUM_IMAGES:
+                raise exceptions.MaximumImageNumberExc
+            await conn.execute(
+                sa.insert(ArticleImage),
+                [{"article_id": article_id, "url": key} for key in keys]
+            )
+    except exceptions.MaximumImageNumberExc as ex:
+        logger.warning(ex)
+        raise exceptions.MaximumImageNumberExc
+    except IntegrityError as ex:
+        logger.warning(ex)
+        raise ArticleNotFound
+    await redis.delete(*[upload_key(key) for key in keys])
+
+# ==================== Bulk import service ==================== #
+
+async def bulk_import_products(
+        manifest: UploadFile,
+        images: UploadFile,
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> BulkImportReport:
+    """
+    Creating products of a csv/xlsx manifest with their images from a zip.
+    Names are resolved with one query each, rows are inserted in chunks
+    and invalid rows are reported instead of aborting the whole import.
+    Manifest columns are ProductIn fields plus "attributes" as
+    "<name>:<value>;..." and "images" as "<file name in zip>;...".
+    """
+    rows = await read_manifest_rows(manifest)
+    try:
+        archive = zipfile.ZipFile(images.file)
+    except zipfile.BadZipFile as ex:
+        logger.warning(ex)
+        raise exceptions.InvalidImageArchive
+    archive_files = {
+        os.path.basename(info.filename): info
+        for info in archive.infolist() if not info.is_dir()
+    }
+
+    errors: list[BulkImportRowError] = []
+    valid_rows: dict[int, tuple[schemas.ProductIn, list[str]]] = dict()
+    seen_serials: set[str] = set()
+    seen_names: set[str] = set()
+    for row_number, row in enumerate(rows, start=2):
+        image_names = [
+            image_name.strip() for image_name in str(row.get("images") or "").split(";")
+            if image_name.strip()
+        ]
+        attribute_values = [
+            attribute.split(":", 1) for attribute in str(row.get("attributes") or "").split(";")
+            if attribute.strip()
+        ]
+        try:
+            payload = schemas.ProductIn.model_validate(
+                {
+                    **row,
+                    "attribute_values": [
+                        {
+                            "attribute": attribute_value[0].strip(),
+                            "value": attribute_value[1].strip() if len(attribute_value) > 1 else None
+                        } for attribute_value in attribute_values
+                    ]
+                }
+            )
+        except ValidationError as ex:
+            errors.append({
+                "row": row_number,
+                "detail": "; ".join(
+                    f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                    for error in ex.errors()
+                )
+            })
+            continue
+        if len(image_names) > admin_config.MAXIMUM_IMAGES:
+            errors.append({"row": row_number, "detail": exceptions.MaximumImageNumberExc().detail})
+        elif missing_images := [name for name in image_names if name not in archive_files]:
+            errors.append({"row": row_number, "detail": f"Images not in zip: {', '.join(missing_images)}"})
+        elif any(
+            archive_files[name].file_size > admin_config.IMAGE_SIZE_LIMIT * 1024 for name in image_names
+        ):
+            errors.append({"row": row_number, "detail": exceptions.ImageSizeExc().detail})
+        elif payload.serial_number in seen_serials or payload.name in seen_names:
+            errors.append({"row": row_number, "detail": "Duplicate serial number or name in manifest!"})
+        else:
+            seen_serials.add(payload.serial_number)
+            seen_names.add(payload.name)
+            valid_rows[row_number] = (payload, image_names)
+
+    payloads = [payload for payload, _ in valid_rows.values()]
+    category_query = sa.select(Category.name, Category.id).where(
+        Category.name.in_({payload.category_name for payload in payloads})
+    )
+    brand_query = sa.select(Brand.name, Brand.id).where(
+        Brand.name.in_({payload.brand_name for payload in payloads})
+    )
+    attribute_query = sa.select(Attribute.name).where(
+        Attribute.name.in_({
+            attribute_value.attribute
+            for payload in payloads for attribute_value in payload.attribute_values
+        })
+    )
+    existing_query = sa.select(Product.serial_number, Product.name).where(
+        sa.or_(
+            Product.serial_number.in_(seen_serials),
+            Product.name.in_(seen_names)
+        )
+    )
+    async with session.begin() as conn:
+        category_ids = dict((await conn.execute(category_query)).tuples().all())
+        brand_ids = dict((await conn.execute(brand_query)).tuples().all())
+        attribute_names = set((await conn.scalars(attribute_query)).all())
+        existing = (await conn.execute(existing_query)).all()
+    existing_serials = {product.serial_number for product in existing}
+    existing_names = {product.name for product in existing}
+
+    products: list[tuple[int, dict, list[dict], list[dict]]] = []
+    for row_number, (payload, image_names) in valid_rows.items():
+        if payload.category_name not in category_ids:
+            errors.append({"row": row_number, "detail": exceptions.CategoryNotFound().detail})
+            continue
+        if payload.brand_name not in brand_ids:
+            errors.append({"row": row_number, "detail": exceptions.BrandNotFound().detail})
+            continue
+        if payload.serial_number in existing_serials:
+            errors.append({"row": row_number, "detail": exceptions.DuplicateProductSerialNumber().detail})
+            continue
+        if payload.name in existing_names:
+            errors.append({"row": row_number, "detail": exceptions.DuplicateProductName().detail})
+            continue
+        if unknown_attributes := {
+            attribute_value.attribute for attribute_value in payload.attribute_values
+        } - attribute_names:
+            errors.append({"row": row_number, "detail": f"Unknown attributes: {', '.join(unknown_attributes)}"})
+            continue
+        product_id = uuid4()
+        products.append((
+            row_number,
+            {
+                "id": product_id,
+                "serial_number": payload.serial_number,
+                "name": payload.name,
+                "description": payload.description,
+                "stock": payload.stock,
+                "price": payload.price,
+                "discount": payload.discount if payload.discount else None,
+                "expiry_discount": payload.expiry_discount if payload.expiry_discount else None,
+                "effective_price": calculate_effective_price(
+                    price=payload.price,
+                    discount=payload.discount,
+                    expiry_discount=payload.expiry_discount
+                ),
+                "brand_id": brand_ids[payload.brand_name],
+                "category_id": category_ids[payload.category_name]
+            },
+            [
+                {
+                    "product_id": product_id,
+                    "attribute_name": attribute_value.attribute,
+                    "value": attribute_value.value
+                } for attribute_value in payload.attribute_values
+            ],
+            [
+                {
+                    "product_id": product_id,
+                    "url": f"{uuid4()}{os.path.splitext(image_name)[1]}",
+                    "archive_name": image_name
+                } for image_name in image_names
+            ]
+        ))
+
+    created = 0
+    uploads: list[tuple[int, ProductId, str, str]] = []
+    dirty_category_ids: set[CategoryId] = set()
+    chunk_size = admin_config.BULK_IMPORT_CHUNK_SIZE
+    for chunk_start in range(0, len(products), chunk_size):
+        chunk = products[chunk_start: chunk_start + chunk_size]
+        attribute_rows = [attribute for _, _, attributes, _ in chunk for attribute in attributes]
+        image_rows = [image for _, _, _, chunk_images in chunk for image in chunk_images]
+        try:
+            async with session.begin() as conn:
+                await conn.execute(sa.insert(Product), [product for _, product, _, _ in chunk])
+                if attribute_rows:
+                    await conn.execute(sa.insert(AttributeValue), attribute_rows)
+                if image_rows:
+                    await conn.execute(
+                        sa.insert(ProductImage),
+                        [{"product_id": image["product_id"], "url": image["url"]} for image in image_rows]
+                    )
+                    await enqueue_upload_checks(
+                        conn=conn,
+                        keys=[image["url"] for image in image_rows],
+                        action="verify_product_image"
+                    )
+        except IntegrityError as ex:
+            logger.warning(ex)
+            errors.extend(
+                {"row": row_number, "detail": "Chunk was rolled back because of a conflicting row!"}
+                for row_number, _, _, _ in chunk
+            )
+            continue
+        created += len(chunk)
+        uploads.extend(
+            (row_number, image["product_id"], image["url"], image["archive_name"])
+            for row_number, _, _, chunk_images in chunk for image in chunk_images
+        )
+        dirty_category_ids.update(product["category_id"] for _, product, _, _ in chunk)
+
+    semaphore = asyncio.Semaphore(admin_config.BULK_IMPORT_UPLOAD_CONCURRENCY)
+
+    async def upload_image(unique_filename: str, archive_name: str) -> None:
+        async with semaphore:
+            await upload_to_s3(
+                file=BytesIO(archive.read(archive_files[archive_name])),
+                unique_filename=unique_filename
+            )
+
+    upload_results = await asyncio.gather(
+        *[upload_image(unique_filename, archive_name) for _, _, unique_filename, archive_name in uploads],
+        return_exceptions=True
+    )
+    # A product whose images didn't all reach s3 is deleted again and
+    # reported, so its row can be imported once more.
+    failed_uploads: dict[ProductId, tuple[int, list[str]]] = dict()
+    for (row_number, product_id, _, archive_name), result in zip(uploads, upload_results):
+        if isinstance(result, Exception):
+            logger.warning(result)
+            failed_uploads.setdefault(product_id, (row_number, []))[1].append(archive_name)
+    for product_id, (row_number, archive_names) in failed_uploads.items():
+        await delete_product(session=session, redis=redis, product_id=product_id)
+        errors.append({"row": row_number, "detail": f"Images failed to upload: {', '.join(archive_names)}"})
+    created -= len(failed_uploads)
+    uploaded_images = [
+        unique_filename for _, product_id, unique_filename, _ in uploads
+        if product_id not in failed_uploads
+    ]
+    if uploaded_images:
+        await redis.lpush(IMAGES_QUEUE_KEY, *uploaded_images)
+    await mark_facets_dirty(redis, *dirty_category_ids)
+    return {
+        "created": created,
+        "errors": sorted(errors, key=lambda error: error["row"])
+    }
+
+# ==================== Image processing service ==================== #
+
+async def process_pending_image(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        pool: Executor
+) -> None:
+    """
+    Generating resized variants of one queued product image, resizing
+    runs in the process pool so it stays out of the request path.
+    A failed image goes to the back of the queue again until it
+    failed IMAGE_PROCESS_MAX_ATTEMPTS times.
+    """
+    queued = await redis.brpop(IMAGES_QUEUE_KEY, timeout=5)
+    if queued is None:
+        return
+    image_name = queued[1]
+    try:
+        image = await get_obj_from_s3(filename=image_name)
+        variants = await asyncio.get_running_loop().run_in_executor(
+            pool, generate_image_variants, image
+        )
+        await asyncio.gather(*[
+            upload_to_s3(file=BytesIO(data), unique_filename=image_variant_key(image_name, variant))
+            for variant, data in variants.items()
+        ])
+        async with session.begin() as conn:
+            await conn.execute(
+                sa.update(ProductImage).where(ProductImage.url==image_name).values(
+                    {
+                        ProductImage.variants_ready: True
+                    }
+                )
+            )
+    except Exception as ex:
+        logger.warning(ex)
+        attempts = await redis.hincrby(IMAGE_ATTEMPTS_KEY, image_name, 1)
+        if attempts < admin_config.IMAGE_PROCESS_MAX_ATTEMPTS:
+            await redis.lpush(IMAGES_QUEUE_KEY, image_name)
+        else:
+            logger.warning(f"Giving up on the variants of {image_name} after {attempts} attempts.")
+            await redis.hdel(IMAGE_ATTEMPTS_KEY, image_name)
+        return
+    await redis.hdel(IMAGE_ATTEMPTS_KEY, image_name)
+    await bump_cache_version(redis, CATALOG)
+
 # ==================== Guaranty service ==================== #
 
 async def add_guaranties(
@@ -758,11 +1225,11 @@ async def add_guaranties(
 # ==================== Extract excel data and insert them to db ==================== #
 
 async def process_excel_data(
-        file: BytesIO,
+        file: BinaryIO,
         session: async_sessionmaker[AsyncSession],
         batch_size: int = 500
 ) -> None:
-    workbook = load_workbook(file)
+    workbook = load_workbook(file, read_only=True)
     sheet = workbook.active
 
     all_rows: list[ExcelEntityTypes] = [
@@ -774,6 +1241,7 @@ async def process_excel_data(
             "produced_at": row[4].replace(" ق.ظ", "").replace(" ب.ظ", "")
         } for row in sheet.iter_rows(min_row=2, values_only=True)
     ]
+    workbook.close()
 
     def chunks(data: list, chunk_size: int):
         for chunk in range(0, len(data), chunk_size):
@@ -821,16 +1289,102 @@ async def delete_ticket(
 ) -> None:
     query = sa.delete(Ticket).where(
         Ticket.id==ticket_id
-    ).returning(Ticket.id)
+    ).returning(Ticket.created_at, *RATING_COLUMNS.values())
     try:
         async with session.begin() as conn:
-            result: TicketId | None = await conn.scalar(query)
-            if result is None:
+            ticket = (await conn.execute(query)).first()
+            if ticket is None:
                 raise exceptions.TicketNotFound
+            await apply_rating_rollup(conn=conn, ticket=ticket, delta=-1)
     except exceptions.TicketNotFound as ex:
         logger.warning(ex)
         raise exceptions.TicketNotFound
 
+
+def average_rating(rating_sum: int, ticket_count: int) -> float | None:
+    return round(rating_sum / ticket_count, 2) if ticket_count else None
+
+
+async def ticket_stats(
+        session: async_sessionmaker[AsyncSession],
+        date_from: date | None,
+        date_to: date | None,
+        interval: StatsInterval
+) -> TicketStatsResponse:
+    """
+    Averages and rating distributions of every category over the
+    range, and their trend per interval, summed from the daily
+    rollups only. Days are UTC days, the range defaults to the
+    last TICKET_STATS_DEFAULT_DAYS days.
+    """
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=admin_config.TICKET_STATS_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise exceptions.InvalidDateRange
+    period = sa.cast(
+        sa.func.date_trunc(sa.literal(interval, literal_execute=True), TicketRatingRollup.day),
+        sa.Date
+    ).label("period")
+    query = (
+        sa.select(
+            period,
+            TicketRatingRollup.category,
+            TicketRatingRollup.rating,
+            sa.func.sum(TicketRatingRollup.ticket_count).label("ticket_count")
+        )
+        .where(TicketRatingRollup.day.between(date_from, date_to))
+        .group_by(period, TicketRatingRollup.category, TicketRatingRollup.rating)
+        .order_by(period)
+    )
+    rows = []
+    try:
+        async with session.begin() as conn:
+            rows = (await conn.execute(query)).all()
+    except Exception as ex:
+        logger.warning(ex)
+
+    distributions: dict[str, dict[int, int]] = {
+        category: {rating: 0 for rating in range(1, 6)} for category in RATING_COLUMNS
+    }
+    # period -> category -> [sum of ratings, ticket count]
+    trend: dict[date, dict[str, list[int]]] = defaultdict(
+        lambda: {category: [0, 0] for category in RATING_COLUMNS}
+    )
+    for row in rows:
+        if row.category not in distributions:
+            continue
+        distributions[row.category][row.rating] += row.ticket_count
+        totals = trend[row.period][row.category]
+        totals[0] += row.rating * row.ticket_count
+        totals[1] += row.ticket_count
+
+    # Every ticket rates every category, so any category counts tickets.
+    first_category = next(iter(RATING_COLUMNS))
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "ticket_count": sum(distributions[first_category].values()),
+        "ratings": [
+            {
+                "category": category,
+                "average": average_rating(
+                    sum(rating * count for rating, count in distribution.items()),
+                    sum(distribution.values())
+                ),
+                "distribution": distribution
+            } for category, distribution in distributions.items()
+        ],
+        "trend": [
+            {
+                "period": trend_period,
+                "ticket_count": categories[first_category][1],
+                "averages": {
+                    category: average_rating(*totals) for category, totals in categories.items()
+                }
+            } for trend_period, categories in trend.items()
+        ]
+    }
+
 # ==================== Article service ==================== #
 
 async def create_article(
@@ -842,7 +1396,8 @@ async def create_article(
     query = sa.insert(Article).values(
         {
             Article.title: payload.title,
-            Article.description: payload.description
+            Article.description: payload.description,
+            Article.preview: article_preview(payload.description)
         }
     ).returning(Article.id)
     try:
@@ -856,7 +1411,11 @@ async def create_article(
                     } for image_name in image_unique_names
                 ]
             )
-            await conn.execute(image_query)
+            if image_unique_names:
+                await conn.execute(image_query)
+                await enqueue_upload_checks(
+                    conn=conn, keys=list(image_unique_names), action="verify_article_image"
+                )
     except IntegrityError as ex:
         logger.warning(ex)
         if "uq_articles_title" in str(ex):
@@ -880,11 +1439,10 @@ async def delete_article(
         async with session.begin() as conn:
             result = list((await conn.scalars(image_query)).all())
             await conn.execute(query)
+            await delete_related_items(conn=conn, kind="article", item_id=article_id)
+            await enqueue_s3_deletes(conn=conn, keys=result)
     except Exception as ex:
         logger.warning(ex)
-    if result:
-        for image_name in result:
-            await delete_from_s3(image_name)
 
 # ==================== Tag service ==================== #
 
@@ -1113,9 +1671,14 @@ async def delete_article_comment(
         article_comment_id: ArticleCommentId,
         session: async_sessionmaker[AsyncSession],
 ) -> None:
-    query = sa.delete(ArticleComment).where(ArticleComment.id==article_comment_id)
+    query = (
+        sa.delete(ArticleComment)
+        .where(ArticleComment.id==article_comment_id)
+        .returning(ArticleComment.article_id)
+    )
     try:
         async with session.begin() as conn:
-            await conn.execute(query)
+            article_id: ArticleId | None = await conn.scalar(query)
+            await decrement_article_comment_count(conn=conn, article_id=article_id)
     except IntegrityError as ex:
         logger.warning(ex)
@@ -1,11 +1,12 @@
-from typing import TypedDict, NewType
+from typing import Literal, TypedDict, NewType
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime
 
 from src.products.types import ProductId, SerialNumber
 
 GuarantyId = NewType("GuarantyId", int)
 GuarantySerial = NewType("GuarantySerial", str)
+StatsInterval = Literal["day", "week", "month"]
 
 class ExcelEntityTypes(TypedDict):
     product_serial_number: str
@@ -27,4 +28,37 @@ class AdminProductDetailResponse(TypedDict):
     category_name: str
     brand_name: str
     image_urls: set[str]
-    attribute_values: dict[str, str]
\ No newline at end of file
+    attribute_values: dict[str, str]
+
+class BulkImportRowError(TypedDict):
+    row: int
+    detail: str
+
+class BulkImportReport(TypedDict):
+    created: int
+    errors: list[BulkImportRowError]
+
+class ImageUploadUrlResponse(TypedDict):
+    key: str
+    url: str
+    fields: dict[str, str]
+
+
+class RatingStatsResponse(TypedDict):
+    category: str
+    average: float | None
+    distribution: dict[int, int]
+
+
+class TicketTrendResponse(TypedDict):
+    period: date
+    ticket_count: int
+    averages: dict[str, float | None]
+
+
+class TicketStatsResponse(TypedDict):
+    date_from: date
+    date_to: date
+    ticket_count: int
+    ratings: list[RatingStatsResponse]
+    trend: list[TicketTrendResponse]
@@ -1,11 +1,18 @@
 import os
+import csv
 
+from io import BytesIO, TextIOWrapper
 from uuid import uuid4
+from datetime import date
+from decimal import Decimal
 from fastapi import UploadFile
-from typing import BinaryIO
+from typing import Any, BinaryIO
+from openpyxl import load_workbook # type: ignore
+from PIL import Image, ImageOps
 
 from src.admin import exceptions
 from src.admin.config import admin_config
+from src.articles.config import article_config
 
 
 async def create_unique_excel_name(file: UploadFile) -> str:
@@ -27,4 +34,79 @@ async def validate_images_and_return_unique_image_names(images: list[UploadFile]
         image.file.seek(0)
         image_unique_names[image_unique_name] = image.file
     return image_unique_names
-        
\ No newline at end of file
+        
+
+def calculate_effective_price(
+        price: Decimal,
+        discount: Decimal | int | None,
+        expiry_discount: date | None
+) -> Decimal:
+    """
+    Value of Product.effective_price, same rule as
+    the migration backfill and the discount expiry job.
+    """
+    if discount and expiry_discount and expiry_discount >= date.today():
+        return round(Decimal(price) * (1 - Decimal(discount) / 100), 3)
+    return Decimal(price)
+
+
+def article_preview(description: str) -> str:
+    """
+    Value of Article.preview, the first TRUNCATED_ARTICLE_WORDS
+    words like the migration backfill.
+    """
+    return " ".join(description.split()[:article_config.TRUNCATED_ARTICLE_WORDS])
+
+
+async def read_manifest_rows(manifest: UploadFile) -> list[dict[str, Any]]:
+    """
+    Rows of a csv or xlsx bulk import manifest keyed by its header,
+    blank cells are returned as None.
+    """
+    if manifest.filename is None:
+        raise exceptions.InvalidManifest
+    file_ext = os.path.splitext(manifest.filename)[1].lower()
+    manifest.file.seek(0)
+    if file_ext == ".csv":
+        reader = csv.DictReader(TextIOWrapper(manifest.file, encoding="utf-8-sig"))
+        rows: list[dict[str, Any]] = list(reader)
+    elif file_ext == ".xlsx":
+        sheet = load_workbook(manifest.file, read_only=True).active
+        sheet_rows = sheet.iter_rows(values_only=True)
+        header = [str(cell).strip() for cell in next(sheet_rows, ())]
+        rows = [dict(zip(header, row)) for row in sheet_rows]
+    else:
+        raise exceptions.InvalidManifest
+    return [
+        {
+            key.strip(): None if value is None or str(value).strip() == "" else value
+            for key, value in row.items() if key
+        } for row in rows
+    ]
+
+
+def image_variant_key(image_name: str, variant: str) -> str:
+    """
+    S3 key of a resized variant, products.service.image_variant_url
+    builds the same key in sql.
+    """
+    return f"{os.path.splitext(image_name)[0]}_{variant}.webp"
+
+
+def generate_image_variants(image: bytes) -> dict[str, bytes]:
+    """
+    Resizing an image into every IMAGE_VARIANT_SIZES variant as webp.
+    CPU bound, so the consumer runs it in a process pool.
+    """
+    with Image.open(BytesIO(image)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "transparency" in original.info else "RGB")
+        variants: dict[str, bytes] = dict()
+        for variant, size in admin_config.IMAGE_VARIANT_SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, format="WEBP", quality=admin_config.IMAGE_VARIANT_QUALITY)
+            variants[variant] = buffer.getvalue()
+    return variants
@@ -3,5 +3,9 @@ from pydantic_settings import BaseSettings
 
 class ArticleConfig(BaseSettings):
     TRUNCATED_ARTICLE_WORDS: int
+    GLOSSARY_AUTOMATON_CACHE_SIZE: int = 1024
+    NEWEST_ARTICLES_CACHE_TTL: int = 1140
+    POPULAR_ARTICLES_CACHE_TTL: int = 300
+    MOST_VIEWED_ARTICLES_CACHE_TTL: int = 180
 
 article_config = ArticleConfig() # type: ignore
@@ -2,6 +2,7 @@ import sqlalchemy as sa
 import sqlalchemy.orm as so
 
 from datetime import datetime
+from decimal import Decimal
 from uuid import uuid4
 
 from src.database import Base
@@ -17,10 +18,29 @@ class Article(Base):
     )
     title: so.Mapped[str] = so.mapped_column(sa.String(200), unique=True)
     description: so.Mapped[str] = so.mapped_column(sa.Text)
+    # Leading words of description for list pages, set on write.
+    preview: so.Mapped[str] = so.mapped_column(sa.Text)
     created_at: so.Mapped[datetime] = so.mapped_column(
-        sa.TIMESTAMP(timezone=True), server_default=sa.func.now()
+        sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), index=True
     )
     views: so.Mapped[int] = so.mapped_column(default=0)
+    # Maintained by rating_article so reads never aggregate ratings.
+    rating_sum: so.Mapped[int] = so.mapped_column(default=0, server_default="0")
+    rating_count: so.Mapped[int] = so.mapped_column(default=0, server_default="0")
+    average_rating: so.Mapped[Decimal] = so.mapped_column(
+        sa.DECIMAL(3, 2),
+        sa.Computed(
+            "CASE WHEN rating_count = 0 THEN 0 "
+            "ELSE round(rating_sum::numeric / rating_count, 2) END"
+        ),
+        index=True,
+        init=False
+    )
+    # Maintained with comment writes so listings never count comments,
+    # the consumer recounts it for comments deleted with their user.
+    comment_count: so.Mapped[int] = so.mapped_column(
+        default=0, server_default="0", init=False
+    )
 
     def __repr__(self) -> str:
         return f"{self.id}"
@@ -98,6 +118,9 @@ class Rating(Base):
 
 class ArticleComment(Base):
     __tablename__ = "article_comments"
+    __table_args__ = (
+        sa.Index("idx_article_comments_keyset", "article_id", "created_at", "id"),
+    )
     id: so.Mapped[types.ArticleCommentId] = so.mapped_column(
         primary_key=True, autoincrement=True
     )
@@ -111,8 +134,7 @@ class ArticleComment(Base):
         index=True
     )
     article_id: so.Mapped[types.ArticleId] = so.mapped_column(
-        sa.ForeignKey(f"{Article.__tablename__}.id", ondelete="CASCADE"),
-        index=True
+        sa.ForeignKey(f"{Article.__tablename__}.id", ondelete="CASCADE")
     )
 
     def __repr__(self) -> str:
@@ -1,17 +1,30 @@
 from redis.asyncio import Redis
-from fastapi import APIRouter, Depends, status
-from typing import Annotated
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from typing import Annotated, Literal
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, AsyncEngine
 
 from src.database import get_session, get_redis
-from src.pagination import PaginatedResponse, PaginationQuerySchema, pagination_query
+from src.http_cache import ARTICLES, cache_policy
+from src.pagination import (
+    CursorQuerySchema,
+    PaginatedResponse,
+    PaginationQuerySchema,
+    cursor_query,
+    pagination_query
+)
+from src.responses import cached_json_response
 from src.articles import schemas
 from src.articles import service
+from src.articles.config import article_config
+from src.related import service as related_service
 from src.articles.types import ArticleId, GlossaryId, ArticleCommentId
 from src.auth.models import User
-from src.auth.dependencies import get_current_active_user
-from src.products.schemas import CommentIn, CommentList
-from src.products.types import CommentListResponse
+from src.auth.dependencies import get_current_active_user, get_optional_user_id
+from src.auth.types import UserId
+from src.products.schemas import CommentIn, CommentPage
+from src.products import service as products_service
+from src.products.config import products_config
+from src.products.types import CommentPageResponse
 
 router = APIRouter()
 
@@ -19,6 +32,7 @@ router = APIRouter()
 
 @router.get(
     "/list-articles/",
+    dependencies=[cache_policy(ARTICLES)],
     status_code=status.HTTP_200_OK,
     response_model=PaginatedResponse[schemas.ArticlesList]
 )
@@ -26,10 +40,17 @@ async def list_articles(
         engine: Annotated[AsyncEngine, Depends(get_session)],
         pagination_info: Annotated[PaginationQuerySchema, Depends(pagination_query)],
         tag_name: str | None = None,
+        tags: Annotated[list[str], Query(alias="tag")] = [],
+        tags_match: Annotated[Literal["all", "any"], Query(alias="tagsMatch")] = "any"
 ):
+    """
+    Filtering by repeated ?tag=... parameters, articles having
+    any of them by default or all of them with tagsMatch=all.
+    """
     result = await service.list_articles(
         engine=engine,
-        tag_name=tag_name,
+        tags=[tag_name, *tags] if tag_name else tags,
+        tags_match=tags_match,
         limit=pagination_info.limit,
         offset=pagination_info.offset
     )
@@ -54,50 +75,81 @@ async def article_detail(
 
 @router.get(
     "/newest-articles/",
+    dependencies=[cache_policy()],
     response_model=list[schemas.ArticleNewest],
     status_code=status.HTTP_200_OK
 )
 async def newest_articles(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
-):
-    result = await service.newest_articles(
-        session=session,
-        redis=redis
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="newest_articles",
+        ttl=article_config.NEWEST_ARTICLES_CACHE_TTL,
+        fetch=lambda: service.newest_articles(session=session),
+        response_model=list[schemas.ArticleNewest]
     )
-    return result
 
 
 @router.get(
     "/popular-articles/",
+    dependencies=[cache_policy()],
     response_model=list[schemas.ArticlePopular],
     status_code=status.HTTP_200_OK
 )
 async def popular_articles(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
-):
-    result = await service.popular_articles(
-        session=session,
-        redis=redis
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="popular_articles",
+        ttl=article_config.POPULAR_ARTICLES_CACHE_TTL,
+        fetch=lambda: service.popular_articles(session=session),
+        response_model=list[schemas.ArticlePopular]
     )
-    return result
 
 
 @router.get(
     "/most-viewed-articles/",
+    dependencies=[cache_policy()],
     response_model=list[schemas.ArticleMostViewed],
     status_code=status.HTTP_200_OK
 )
 async def most_viewed_articles(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="most_viewed_articles",
+        ttl=article_config.MOST_VIEWED_ARTICLES_CACHE_TTL,
+        fetch=lambda: service.most_viewed_articles(session=session),
+        response_model=list[schemas.ArticleMostViewed]
+    )
+
+
+@router.get(
+    "/related/{article_id}/",
+    dependencies=[cache_policy()],
+    response_model=list[schemas.ArticleOneImage],
+    status_code=status.HTTP_200_OK
+)
+async def related_articles(
+    article_id: ArticleId,
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
 ):
-    result = await service.most_viewed_articles(
+    return await related_service.related_articles(
         session=session,
-        redis=redis
+        article_id=article_id
     )
-    return result
 
 
 # @router.get(
@@ -128,6 +180,7 @@ async def rating_article(
 
 @router.get(
     "/search-tags/",
+    dependencies=[cache_policy(ARTICLES)],
     status_code=status.HTTP_200_OK,
     response_model=list[str]
 )
@@ -145,6 +198,7 @@ async def search_tag_by_name(
 
 @router.get(
     "/get-glossaries/{article_id}/",
+    dependencies=[cache_policy(ARTICLES)],
     status_code=status.HTTP_200_OK,
     response_model=list[schemas.Glossary]
 )
@@ -161,6 +215,7 @@ async def get_glossaries(
 
 @router.get(
     "/get-glossary/{glossary_id}/",
+    dependencies=[cache_policy(ARTICLES)],
     status_code=status.HTTP_200_OK,
     response_model=schemas.Glossary
 )
@@ -184,30 +239,52 @@ async def create_article_comment(
     article_id: ArticleId,
     payload: CommentIn,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
     user: Annotated[User, Depends(get_current_active_user)]
 ) -> dict:
-    await service.create_article_comment(
-        session=session,
-        article_id=article_id,
-        payload=payload,
-        user_id=user.id
-    )
+    if products_config.COMMENT_BUFFER_ENABLED:
+        await products_service.buffer_comment(
+            session=session,
+            redis=redis,
+            kind="article",
+            target_id=article_id,
+            user_id=user.id,
+            username=user.username,
+            message=payload.message
+        )
+    else:
+        await service.create_article_comment(
+            session=session,
+            article_id=article_id,
+            payload=payload,
+            user_id=user.id
+        )
     return {"detail": "Created successfully."}
 
 
 @router.get(
     "/list-article-comments/{article_id}/",
     status_code=status.HTTP_200_OK,
-    response_model=list[CommentList]
+    response_model=CommentPage
 )
 async def list_article_comments(
     article_id: ArticleId,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
-) -> list[CommentListResponse]:
+    redis: Annotated[Redis, Depends(get_redis)],
+    cursor_info: Annotated[CursorQuerySchema, Depends(cursor_query)],
+    user_id: Annotated[UserId | None, Depends(get_optional_user_id)]
+) -> CommentPageResponse:
     result = await service.list_article_comments(
         article_id=article_id,
-        session=session
+        session=session,
+        limit=cursor_info.limit,
+        after=cursor_info.after
     )
+    if products_config.COMMENT_BUFFER_ENABLED and user_id is not None and cursor_info.after is None:
+        pending = await products_service.pending_comments(
+            redis=redis, kind="article", target_id=article_id, user_id=user_id
+        )
+        result = products_service.merge_pending_comments(page=result, pending=pending)
     return result
 
 
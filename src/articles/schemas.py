@@ -5,7 +5,6 @@ from decimal import Decimal
 
 from src.schemas import CustomBaseModel
 from src.articles.types import ArticleId, GlossaryId
-from src.articles.config import article_config
 from src.s3.config import storage_config
 
 
@@ -46,12 +45,11 @@ class ArticlesList(ArticleOneImage):
     ] = Decimal(0)
     created_at: Annotated[datetime, Field(alias="createdAt")]
 
-    @field_validator("description", mode="after")
-    @classmethod
-    def truncate_description(cls, description: str) -> str:
-        splitted_words = description.split()
-        truncated_text = ' '.join(splitted_words[:article_config.TRUNCATED_ARTICLE_WORDS])
-        return truncated_text
+
+class GlossaryMatch(CustomBaseModel):
+    glossary_id: Annotated[GlossaryId, Field(alias="glossaryId")]
+    start: int
+    end: int
 
 
 class ArticleDetail(ArticleBase):
@@ -63,6 +61,7 @@ class ArticleDetail(ArticleBase):
     ] = Decimal(0)
     images: list[str]
     created_at: Annotated[datetime, Field(alias="createdAt")]
+    glossary: list[GlossaryMatch] = []
 
     @field_validator("images", mode="after")
     @classmethod
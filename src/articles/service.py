@@ -1,13 +1,13 @@
 import logging
 import sqlalchemy as sa
-import json
 
-from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from typing import Literal
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.dialects.postgresql import insert as postgres_insert
 
-from src.pagination import paginate
+from src.pagination import keyset_paginate, next_cursor, paginate
 from src.articles import exceptions
 from src.articles.models import (
     Article,
@@ -19,19 +19,15 @@ from src.articles.models import (
     ArticleComment
 )
 from src.articles.types import ArticleId, GlossaryId, ArticleCommentId
+from src.articles.utils import glossary_automaton
 from src.auth.models import User
 from src.auth.types import UserId
 from src.products.schemas import CommentIn
-from src.products.types import CommentListResponse
+from src.products.types import CommentPageResponse
 from src.products.exceptions import CommentNotCreated, CommentNotOwner
 
 logger = logging.getLogger("articles")
 
-rating_cte = sa.select(
-    Rating.article_id.label("rating_article_id"),
-    sa.func.avg(Rating.rating).label("average_rating")
-).group_by(Rating.article_id).cte()
-
 image_cte = sa.select(
     ArticleImage.article_id.label("image_article_id"),
     (sa.func.min(ArticleImage.url)).label("image")
@@ -39,36 +35,59 @@ image_cte = sa.select(
 
 # ==================== Article service ==================== #
 
+def tag_filter(
+        tags: list[str],
+        tags_match: Literal["all", "any"]
+) -> sa.ColumnElement[bool]:
+    """
+    Semi-joins against article_tags, one EXISTS for "any" of
+    the tags and one per tag when "all" of them are required.
+    """
+    def has_any_tag(tag_names: list[str]) -> sa.Exists:
+        return sa.exists().where(
+            sa.and_(
+                ArticleTag.article_id==Article.id,
+                ArticleTag.tag_name.in_(tag_names)
+            )
+        )
+    if tags_match == "any":
+        return has_any_tag(tags)
+    return sa.and_(*[has_any_tag([tag]) for tag in tags])
+
+
 async def list_articles(
         engine: AsyncEngine,
         limit: int,
         offset: int,
-        tag_name: str | None
+        tags: list[str],
+        tags_match: Literal["all", "any"] = "any"
 ) -> dict | None:
-    
+    """
+    Tags and image are correlated subqueries instead of a GROUP BY over
+    all articles, postgres evaluates them after ORDER BY/LIMIT so only
+    rows of the requested page are aggregated.
+    """
     query = (
         sa.select(
             Article.id,
             Article.title,
-            sa.func.array_agg(ArticleTag.tag_name).label("tags"),
-            Article.description,
+            sa.func.array(
+                sa.select(ArticleTag.tag_name)
+                .where(ArticleTag.article_id==Article.id)
+                .scalar_subquery()
+            ).label("tags"),
+            Article.preview.label("description"),
             Article.created_at,
-            rating_cte.c.average_rating,
-            image_cte.c.image
+            Article.average_rating,
+            sa.select(sa.func.min(ArticleImage.url))
+            .where(ArticleImage.article_id==Article.id)
+            .scalar_subquery()
+            .label("image")
         )
-        .select_from(Article)
-
-        .join(ArticleTag, Article.id==ArticleTag.article_id, isouter=True)
-        .join(rating_cte, Article.id==rating_cte.c.rating_article_id, isouter=True)
-        .join(image_cte, Article.id==image_cte.c.image_article_id, isouter=True)
-        .group_by(
-            Article.id,
-            rating_cte.c.average_rating,
-            image_cte.c.image
-        ).order_by(Article.created_at.desc())
+        .order_by(Article.created_at.desc())
     )
-    if tag_name:
-        query = query.having(sa.any_(sa.func.array_agg(ArticleTag.tag_name)) == tag_name)
+    if tags:
+        query = query.where(tag_filter(tags=tags, tags_match=tags_match))
     result = await paginate(engine=engine, query=query, limit=limit, offset=offset)
     if result:
         return result
@@ -85,12 +104,11 @@ async def article_detail(
             Article.title,
             Article.description,
             Article.created_at,
-            rating_cte.c.average_rating,
+            Article.average_rating,
             sa.func.array_agg(sa.func.distinct(ArticleImage.url)).label("images"),
             sa.func.array_agg(sa.func.distinct(ArticleTag.tag_name)).label("tags"),
         )
         .select_from(Article)
-        .join(rating_cte, Article.id==rating_cte.c.rating_article_id, isouter=True)
         .join(ArticleImage, Article.id==ArticleImage.article_id, isouter=True)
         .join(ArticleTag, Article.id==ArticleTag.article_id, isouter=True)
         .group_by(
@@ -99,7 +117,6 @@ async def article_detail(
             Article.description,
             Article.views,
             Article.created_at,
-            rating_cte.c.average_rating,
         )
         .where(Article.id==article_id)
     )
@@ -108,14 +125,18 @@ async def article_detail(
             Article.views: Article.views + 1
         }
     ).where(Article.id==article_id)
+    glossary_terms_query = (
+        sa.select(GlossaryTerm.id, GlossaryTerm.term)
+        .where(GlossaryTerm.article_id==article_id)
+        .order_by(GlossaryTerm.id)
+    )
     try:
         async with session.begin() as conn:
             result = (await conn.execute(query)).first()
-            if result is not None:
-                await conn.execute(update_views_query)
-                return result._asdict()
-            else:
+            if result is None:
                 raise exceptions.ArticleNotFound
+            await conn.execute(update_views_query)
+            glossary_terms = (await conn.execute(glossary_terms_query)).tuples().all()
 
     except exceptions.ArticleNotFound as ex:
         logger.warning(ex)
@@ -125,13 +146,16 @@ async def article_detail(
         logger.warning(ex)
         return None
 
+    article = result._asdict()
+    if glossary_terms:
+        automaton = glossary_automaton(tuple(glossary_terms))
+        article["glossary"] = automaton.search(article["description"])
+    return article
+
 
 async def newest_articles(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ):
-    if cached_data := await redis.get(name="newest_articles"):
-        return json.loads(cached_data)
     query = (
         sa.select(
             Article.id,
@@ -149,64 +173,22 @@ async def newest_articles(
             articles = (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
-    articles_list = [
-        {
-            "id": str(article.id),
-            "title": article.title,
-            "created_at": str(article.created_at),
-            "image": article.image
-        } for article in articles
-    ]
-    await redis.set(
-        name="newest_articles",
-        value=json.dumps(articles_list),
-        ex=1140
-    )
     return articles
 
 
 async def popular_articles(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ):
-    if cached_data := await redis.get(name="popular_articles"):
-        return json.loads(cached_data)
-
-    rating_cte = sa.select(
-        Rating.article_id.label("rating_article_id"),
-        sa.func.avg(Rating.rating).label("average_rating")
-    ).group_by(Rating.article_id).cte()
-
-    image_cte = sa.select(
-        ArticleImage.article_id.label("image_article_id"),
-        (sa.func.min(ArticleImage.url)).label("image")
-    ).group_by(ArticleImage.article_id).cte()
     query = (
         sa.select(
             Article.id,
             Article.title,
-            sa.case(
-                (
-                    (
-                        rating_cte.c.average_rating.is_(None)
-                    ),
-                    0
-                ),
-                else_=rating_cte.c.average_rating
-            ).label("average_rating"),
+            Article.average_rating,
             image_cte.c.image
         )
         .select_from(Article)
-        .join(rating_cte, Article.id==rating_cte.c.rating_article_id, isouter=True)
         .join(image_cte, Article.id==image_cte.c.image_article_id)
-        .order_by(
-            sa.case(
-                (
-                    (rating_cte.c.average_rating.is_(None)),
-                    0
-                ), else_=rating_cte.c.average_rating
-            ).desc()
-        )
+        .order_by(Article.average_rating.desc())
         .limit(10)
     )
     try:
@@ -214,28 +196,12 @@ async def popular_articles(
             articles = (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
-    articles_list = [
-        {
-            "id": str(article.id),
-            "title": article.title,
-            "average_rating": str(article.average_rating),
-            "image": article.image
-        } for article in articles
-    ]
-    await redis.set(
-        name="popular_articles",
-        value=json.dumps(articles_list),
-        ex=300 
-    )
     return articles
 
 
 async def most_viewed_articles(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ):
-    if cached_data := await redis.get(name="most_viewed_articles"):
-        return json.loads(cached_data)
     query = (
         sa.select(
             Article.id,
@@ -253,19 +219,6 @@ async def most_viewed_articles(
             articles = (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
-    articles_list = [
-        {
-            "id": str(article.id),
-            "title": article.title,
-            "views": str(article.views),
-            "image": article.image
-        } for article in articles
-    ]
-    await redis.set(
-        name="most_viewed_articles",
-        value=json.dumps(articles_list),
-        ex=180
-    )
     return articles
 
 # ==================== Rating service ==================== #
@@ -276,6 +229,18 @@ async def rating_article(
         user_id: UserId,
         rating: int
 ) -> None:
+    """
+    Upserting the user's rating and applying its delta to
+    Article.rating_sum/rating_count. The article row is locked first,
+    so concurrent ratings of it can't read the same previous rating.
+    """
+    lock_article_query = sa.select(Article.id).where(Article.id==article_id).with_for_update()
+    previous_rating_query = sa.select(Rating.rating).where(
+        sa.and_(
+            Rating.user_id==user_id,
+            Rating.article_id==article_id
+        )
+    )
     query = postgres_insert(Rating).values({
         Rating.rating: rating,
         Rating.user_id: user_id,
@@ -287,7 +252,21 @@ async def rating_article(
     )
     try:
         async with session.begin() as conn:
+            if await conn.scalar(lock_article_query) is None:
+                raise exceptions.ArticleNotFound
+            previous_rating: int | None = await conn.scalar(previous_rating_query)
             await conn.execute(do_update_stmt)
+            await conn.execute(
+                sa.update(Article).where(Article.id==article_id).values(
+                    {
+                        Article.rating_sum: Article.rating_sum + rating - (previous_rating or 0),
+                        Article.rating_count: Article.rating_count + int(previous_rating is None)
+                    }
+                )
+            )
+    except exceptions.ArticleNotFound as ex:
+        logger.warning(ex)
+        raise exceptions.ArticleNotFound
     except Exception as ex:
         logger.warning(ex)
 
@@ -354,43 +333,85 @@ async def create_article_comment(
             ArticleComment.user_id: user_id
         }
     )
+    count_query = (
+        sa.update(Article)
+        .where(Article.id==article_id)
+        .values({Article.comment_count: Article.comment_count + 1})
+    )
     try:
         async with session.begin() as conn:
             await conn.execute(query)
+            await conn.execute(count_query)
     except IntegrityError as ex:
         logger.warning(ex)
         raise CommentNotCreated
 
 
+async def decrement_comment_count(
+        conn: AsyncConnection,
+        article_id: ArticleId | None
+) -> None:
+    """
+    Called with the article_id returned by a comment delete,
+    inside the transaction of the delete.
+    """
+    if article_id is None:
+        return
+    await conn.execute(
+        sa.update(Article)
+        .where(Article.id==article_id)
+        .values({Article.comment_count: Article.comment_count - 1})
+    )
+
+
 async def list_article_comments(
         session: async_sessionmaker[AsyncSession],
-        article_id: ArticleId
-) -> list[CommentListResponse]:
-    query = (
-        sa.select(
-            ArticleComment.id,
-            ArticleComment.message,
-            ArticleComment.created_at,
-            User.username
-        )
-        .select_from(ArticleComment)
-        .join(User, ArticleComment.user_id==User.id)
-        .where(ArticleComment.article_id==article_id)
-        .order_by(ArticleComment.created_at.desc())
+        article_id: ArticleId,
+        limit: int,
+        after: tuple[datetime, int] | None = None
+) -> CommentPageResponse:
+    """
+    A page of the article's comments, newest first. The total is
+    Article.comment_count, so no page runs count(*).
+    """
+    count_query = sa.select(Article.comment_count).where(Article.id==article_id)
+    query = keyset_paginate(
+        query=(
+            sa.select(
+                ArticleComment.id,
+                ArticleComment.message,
+                ArticleComment.created_at,
+                User.username
+            )
+            .select_from(ArticleComment)
+            .join(User, ArticleComment.user_id==User.id)
+            .where(ArticleComment.article_id==article_id)
+        ),
+        created_at=ArticleComment.created_at,
+        row_id=ArticleComment.id,
+        limit=limit,
+        after=after
     )
+    count, result = 0, []
     try:
         async with session.begin() as conn:
-            result = (await conn.execute(query)).all()
+            count = await conn.scalar(count_query) or 0
+            result = list((await conn.execute(query)).all())
     except Exception as ex:
         logger.warning(ex)
-    return [
-        {
-            "id": comment.id,
-            "username": comment.username,
-            "message": comment.message,
-            "created_at": comment.created_at
-        } for comment in result
-    ]
+    return {
+        "count": count,
+        "items": [
+            {
+                "id": comment.id,
+                "username": comment.username,
+                "message": comment.message,
+                "created_at": comment.created_at,
+                "pending": False
+            } for comment in result[:limit]
+        ],
+        "next_cursor": next_cursor(rows=result, limit=limit)
+    }
 
 
 async def delete_my_article_comment(
@@ -403,12 +424,13 @@ async def delete_my_article_comment(
             ArticleComment.id==article_comment_id,
             ArticleComment.user_id==user_id
         )
-    ).returning(ArticleComment.id)
+    ).returning(ArticleComment.article_id)
     try:
         async with session.begin() as conn:
-            result: ArticleCommentId | None = await conn.scalar(query)
+            result: ArticleId | None = await conn.scalar(query)
             if result is None:
                 raise CommentNotOwner
+            await decrement_comment_count(conn=conn, article_id=result)
     except CommentNotOwner as ex:
         logger.warning(ex)
         raise CommentNotOwner
@@ -1,4 +1,4 @@
-from typing import NewType
+from typing import NewType, TypedDict
 from uuid import UUID
 
 ArticleId = NewType("ArticleId", UUID)
@@ -7,3 +7,8 @@ RatingId = NewType("RatingId", int)
 ArticleCommentId = NewType("ArticleCommentId", int)
 GlossaryId = NewType("GlossaryId", int)
 
+
+class GlossaryMatch(TypedDict):
+    glossary_id: GlossaryId
+    start: int
+    end: int
@@ -0,0 +1,94 @@
+from collections import deque
+from functools import lru_cache
+
+from src.articles.config import article_config
+from src.articles.types import GlossaryId, GlossaryMatch
+
+
+def normalize(text: str) -> str:
+    """
+    Lower cased text with the same length, so offsets
+    found in it are offsets of the original text too.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(
+        char.lower() if len(char.lower()) == 1 else char for char in text
+    )
+
+
+def is_word_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class GlossaryAutomaton:
+    """
+    Aho-Corasick automaton over the glossary terms of an article,
+    finds every term in a text with one pass over it.
+    """
+    def __init__(self, terms: tuple[tuple[GlossaryId, str], ...]) -> None:
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # (glossary_id, term length) of the terms ending at each node.
+        self.output: list[list[tuple[GlossaryId, int]]] = [[]]
+
+        for glossary_id, term in terms:
+            term = normalize(term.strip())
+            if not term:
+                continue
+            node = 0
+            for char in term:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((glossary_id, len(term)))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text: str) -> list[GlossaryMatch]:
+        """
+        Whole word, case insensitive occurrences of the terms as
+        [start, end) character offsets. Overlapping occurrences are
+        resolved leftmost first, then longest.
+        """
+        normalized = normalize(text)
+        found: list[tuple[int, int, GlossaryId]] = []
+        node = 0
+        for index, char in enumerate(normalized):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for glossary_id, length in self.output[node]:
+                start = index - length + 1
+                if is_word_boundary(normalized, start - 1) and is_word_boundary(normalized, index + 1):
+                    found.append((start, index + 1, glossary_id))
+
+        matches: list[GlossaryMatch] = []
+        last_end = 0
+        for start, end, glossary_id in sorted(found, key=lambda match: (match[0], -match[1])):
+            if start >= last_end:
+                matches.append({"glossary_id": glossary_id, "start": start, "end": end})
+                last_end = end
+        return matches
+
+
+@lru_cache(maxsize=article_config.GLOSSARY_AUTOMATON_CACHE_SIZE)
+def glossary_automaton(terms: tuple[tuple[GlossaryId, str], ...]) -> GlossaryAutomaton:
+    """
+    Automatons are cached by their terms, so creating, updating or
+    deleting a glossary term makes the next read build a new one.
+    """
+    return GlossaryAutomaton(terms)
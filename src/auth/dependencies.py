@@ -16,6 +16,7 @@ secret_key = auth_config.SECRET_KEY
 algorithm = auth_config.JWT_ALGORITHM
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_schema = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 
 async def decode_access_token(token: Annotated[str, Depends(oauth2_schema)]) -> dict:
@@ -26,6 +27,22 @@ async def decode_access_token(token: Annotated[str, Depends(oauth2_schema)]) ->
     return data
 
 
+async def get_optional_user_id(
+        token: Annotated[str | None, Depends(optional_oauth2_schema)]
+) -> UserId | None:
+    """
+    Id of the caller of public routes from the token alone, None
+    for anonymous callers and invalid tokens, without a db query.
+    """
+    if token is None:
+        return None
+    try:
+        data = jwt.decode(jwt=token, key=secret_key, algorithms=[algorithm])
+    except Exception:
+        return None
+    return data.get("user_id")
+
+
 async def get_current_active_user(
         data: Annotated[dict, Depends(decode_access_token)],
         session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
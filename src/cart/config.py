@@ -3,5 +3,8 @@ from pydantic_settings import BaseSettings
 
 class CartConfig(BaseSettings):
     CART_CACHE_TTL_SEC: int
+    CART_SYNC_INTERVAL_SEC: int = 60
+    CART_SYNC_BATCH_SIZE: int = 500
+    PRODUCT_PRICE_CACHE_TTL_SEC: int = 60
 
 cart_config = CartConfig() # type: ignore
@@ -37,6 +37,7 @@ class CartProduct(Base):
     __tablename__ = "cart_products"
     __table_args__ = (
         sa.PrimaryKeyConstraint("cart_id", "product_id"),
+        sa.CheckConstraint("quantity >= 1", name="check_positive_quantity"),
     )
 
     cart_id: so.Mapped[types.CartId] = so.mapped_column(sa.ForeignKey(
@@ -45,6 +46,7 @@ class CartProduct(Base):
     product_id: so.Mapped[ProductId] = so.mapped_column(sa.ForeignKey(
         f"{Product.__tablename__}.id", ondelete="CASCADE"
     ), index=True)
+    quantity: so.Mapped[int] = so.mapped_column(default=1, server_default="1")
 
     def __repr__(self) -> str:
         return f"cart_id: {self.cart_id}, product_id: {self.product_id}"
\ No newline at end of file
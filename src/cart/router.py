@@ -5,20 +5,38 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.database import get_session, get_redis
 from src.cart import service
-from src.cart.schemas import AddProductToCartIn
+from src.cart.schemas import AddProductToCartIn, Cart
+from src.cart.types import CartResponse
 from src.auth.models import User
 from src.auth.dependencies import get_current_active_user
 
 router = APIRouter()
 
 
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=Cart
+)
+async def get_cart(
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    user: Annotated[User, Depends(get_current_active_user)]
+) -> CartResponse:
+    return await service.get_cart(
+        session=session,
+        redis=redis,
+        user_id=user.id
+    )
+
+
 @router.put(
     "/update-cart/",
     status_code=status.HTTP_204_NO_CONTENT
 )
 async def update_cart(
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     payload: AddProductToCartIn,
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)],
     user: Annotated[User, Depends(get_current_active_user)]
 ):
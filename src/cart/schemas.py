@@ -7,10 +7,21 @@ from src.products.types import ProductId
 
 
 class AddProductToCartIn(CustomBaseModel):
-    product_id: Annotated[ProductId | None, Field(alias="productId")] = None
+    product_id: Annotated[ProductId, Field(alias="productId")]
     total_quantity_action: Annotated[
         Literal["increment", "decrement"],
         Field(alias="totalQuantityAction")
     ]
+
+
+class CartItem(CustomBaseModel):
+    product_id: Annotated[ProductId, Field(alias="productId")]
+    quantity: int
+    unit_price: Annotated[Decimal | None, Field(alias="unitPrice")] = None
+    total_price: Annotated[Decimal | None, Field(alias="totalPrice")] = None
+
+
+class Cart(CustomBaseModel):
+    items: list[CartItem]
     total_quantity: Annotated[int, Field(alias="totalQuantity")]
     total_price: Annotated[Decimal, Field(alias="totalPrice")]
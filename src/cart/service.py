@@ -1,15 +1,54 @@
-import json
+import logging
 import sqlalchemy as sa
 
+from uuid import UUID
 from decimal import Decimal
 from redis.asyncio import Redis
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.cart.models import Cart, CartProduct
 from src.cart.config import cart_config
 from src.cart.schemas import AddProductToCartIn
-from src.cart.types import CartPayloadKeyType, MessageJsonType, CartId
+from src.cart.types import CartResponse, CartItemResponse
 from src.auth.types import UserId
+from src.products.models import Product
+from src.products.types import ProductId
+
+logger = logging.getLogger("cart")
+
+DIRTY_CARTS_KEY = "cart:dirty-users"
+
+# Increments/decrements one item of the cart hash, drops it when it reaches
+# zero and marks the cart as dirty for the consumer, all in one round trip.
+UPDATE_CART_SCRIPT = """
+local quantity = redis.call("HINCRBY", KEYS[1], ARGV[1], ARGV[2])
+if quantity <= 0 then
+    redis.call("HDEL", KEYS[1], ARGV[1])
+    quantity = 0
+end
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+redis.call("SADD", KEYS[2], ARGV[4])
+return quantity
+"""
+
+# Writes the cart rows read from db back into the hash, unless the hash
+# was recreated meanwhile or the user is dirty, i.e. an emptied cart
+# which is not synced yet and whose db rows are stale.
+RESTORE_CART_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 and redis.call("SISMEMBER", KEYS[2], ARGV[1]) == 0 then
+    for i = 3, #ARGV, 2 do
+        redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+    redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return redis.call("HGETALL", KEYS[1])
+"""
+
+
+def cart_key(user_id: UserId | str) -> str:
+    return f"cart:user_id:{user_id}"
 
 
 async def create_cart(
@@ -28,57 +67,265 @@ async def create_cart(
     await conn.execute(query)
 
 
+async def load_cart(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        user_id: UserId
+) -> dict[str, str]:
+    """
+    Items of the user's cart hash, which is restored from
+    cart_products when it expired or redis lost it.
+    """
+    items: dict[str, str] = await redis.hgetall(cart_key(user_id))
+    if items:
+        return items
+    query = sa.select(CartProduct.product_id, CartProduct.quantity).join(
+        Cart, Cart.id==CartProduct.cart_id
+    ).where(Cart.user_id==user_id)
+    async with session.begin() as conn:
+        rows = (await conn.execute(query)).all()
+    if not rows:
+        return {}
+    restore_cart_script = redis.register_script(RESTORE_CART_SCRIPT)
+    restored: list[str] = await restore_cart_script(
+        keys=[cart_key(user_id), DIRTY_CARTS_KEY],
+        args=[
+            user_id,
+            cart_config.CART_CACHE_TTL_SEC,
+            *[value for row in rows for value in (str(row.product_id), row.quantity)]
+        ]
+    )
+    return dict(zip(restored[::2], restored[1::2]))
+
+
 async def update_cart(
         session: async_sessionmaker[AsyncSession],
         redis: Redis,
         user_id: UserId,
         payload: AddProductToCartIn
 ) -> None:
-    payload_cart_data: CartPayloadKeyType = {
-        "user_id": str(user_id),
-        "total_quantity": payload.total_quantity,
-        "total_price": str(payload.total_price)
-    }
+    """
+    Carts live in a redis hash of product_id -> quantity,
+    persisting them into db is done by the consumer in batches.
+    """
+    if not await redis.exists(cart_key(user_id)):
+        await load_cart(session=session, redis=redis, user_id=user_id)
+    update_cart_script = redis.register_script(UPDATE_CART_SCRIPT)
+    await update_cart_script(
+        keys=[cart_key(user_id), DIRTY_CARTS_KEY],
+        args=[
+            str(payload.product_id),
+            1 if payload.total_quantity_action == "increment" else -1,
+            cart_config.CART_CACHE_TTL_SEC,
+            user_id
+        ]
+    )
 
-    cached_cart = await redis.get(name=f"cart:user_id:{user_id}")
 
-    if cached_cart:
-        await redis.set(
-            name=f"cart:user_id:{user_id}:{json.dumps(payload_cart_data)}",
-            value=1,
-            ex=cart_config.CART_CACHE_TTL_SEC
+def calculate_cart(
+        items: dict[str, str],
+        prices: dict[str, str | None]
+) -> CartResponse:
+    cart_items: list[CartItemResponse] = []
+    total_quantity = 0
+    total_price = Decimal(0)
+    for product_id, quantity in items.items():
+        unit_price = prices.get(product_id)
+        item_total = Decimal(unit_price) * int(quantity) if unit_price else None
+        cart_items.append(
+            {
+                "product_id": ProductId(UUID(product_id)),
+                "quantity": int(quantity),
+                "unit_price": Decimal(unit_price) if unit_price else None,
+                "total_price": item_total
+            }
         )
+        total_quantity += int(quantity)
+        if item_total is not None:
+            total_price += item_total
+    return {
+        "items": cart_items,
+        "total_quantity": total_quantity,
+        "total_price": total_price
+    }
 
-    else:
-        await redis.set(
-            name=f"cart:user_id:{user_id}:{json.dumps(payload_cart_data)}",
-            value=1,
-            ex=cart_config.CART_CACHE_TTL_SEC
-        )
 
-    cart_id_query = sa.select(Cart.id).where(Cart.user_id==user_id)
-    async with session.begin() as conn:
-        cart_id: CartId | None = await conn.scalar(cart_id_query)
-        query = sa.insert(CartProduct).values(
-            {
-                CartProduct.cart_id: cart_id,
-                CartProduct.product_id: payload.product_id
-            }
+async def get_product_prices(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        product_ids: list[str],
+        partial_on_error: bool = False
+) -> dict[str, str | None]:
+    """
+    Returning effective price of the given products, cached ones
+    come from redis and the misses are fetched with one query.
+    With partial_on_error a failing query returns the cached prices
+    only, which is fine for showing a cart but not for syncing it,
+    a missing price drops the item from cart_products.
+    """
+    if not product_ids:
+        return {}
+    cached_prices = await redis.mget([f"product-price:{product_id}" for product_id in product_ids])
+    prices: dict[str, str | None] = {
+        product_id: price or None
+        for product_id, price in zip(product_ids, cached_prices) if price is not None
+    }
+    missed_ids = [product_id for product_id in product_ids if product_id not in prices]
+    if not missed_ids:
+        return prices
+
+    query = sa.select(Product.id, Product.effective_price).where(
+        sa.and_(
+            Product.id==sa.any_(sa.bindparam(
+                "ids",
+                [UUID(product_id) for product_id in missed_ids],
+                type_=ARRAY(sa.UUID)
+            )),
+            Product.is_active.is_(True)
         )
-        await conn.execute(query)
+    )
+    try:
+        async with session.begin() as conn:
+            result = (await conn.execute(query)).all()
+    except Exception as ex:
+        logger.warning(ex)
+        if partial_on_error:
+            return prices
+        raise
+    fetched_prices = {str(product.id): str(product.effective_price) for product in result}
+    async with redis.pipeline(transaction=False) as pipe:
+        for product_id in missed_ids:
+            # Empty string is cached for inactive or deleted products.
+            pipe.set(
+                name=f"product-price:{product_id}",
+                value=fetched_prices.get(product_id, ""),
+                ex=cart_config.PRODUCT_PRICE_CACHE_TTL_SEC
+            )
+        await pipe.execute()
+    prices.update({product_id: fetched_prices.get(product_id) for product_id in missed_ids})
+    return prices
 
 
-async def insert_updated_cart_to_db(
-        json_message: MessageJsonType,
-        session: async_sessionmaker[AsyncSession]
-) -> None:
-    query = sa.update(Cart).where(
-            Cart.user_id==int(json_message["user_id"])
-    ).values(
-        {
-            Cart.total_quantity: json_message["total_quantity"],
-            Cart.total_price: Decimal(json_message["total_price"])
-        }
+async def get_cart(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        user_id: UserId
+) -> CartResponse:
+    items = await load_cart(session=session, redis=redis, user_id=user_id)
+    prices = await get_product_prices(
+        session=session, redis=redis, product_ids=list(items), partial_on_error=True
     )
+    return calculate_cart(items=items, prices=prices)
+
+# ==================== Consumer side ==================== #
+
+async def sync_dirty_carts(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Persisting carts which changed since the last run
+    into cart_products, one transaction per batch.
+    On failure the popped ids are put back for the next run.
+    """
+    while user_ids := await redis.spop(
+        DIRTY_CARTS_KEY, count=cart_config.CART_SYNC_BATCH_SIZE
+    ):
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id in user_ids:
+                    pipe.hgetall(cart_key(user_id))
+                carts: list[dict[str, str]] = await pipe.execute()
+
+            prices = await get_product_prices(
+                session=session,
+                redis=redis,
+                product_ids=list({product_id for items in carts for product_id in items})
+            )
+            await insert_carts_to_db(
+                session=session,
+                carts={int(user_id): items for user_id, items in zip(user_ids, carts)},
+                prices=prices
+            )
+        except IntegrityError as ex:
+            logger.warning(ex)
+            if not await sync_carts_one_by_one(
+                session=session,
+                redis=redis,
+                carts={int(user_id): items for user_id, items in zip(user_ids, carts)},
+                prices=prices
+            ):
+                return
+        except Exception as ex:
+            logger.warning(ex)
+            await redis.sadd(DIRTY_CARTS_KEY, *user_ids)
+            return
+
+
+async def sync_carts_one_by_one(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        carts: dict[int, dict[str, str]],
+        prices: dict[str, str | None]
+) -> bool:
+    """
+    Retrying a batch which failed on a constraint cart by cart, so
+    one cart which can never be written (e.g. its user was deleted)
+    is dropped instead of holding back the rest of the batch.
+    Returns False if some other error stopped it, the carts not
+    written yet are put back then.
+    """
+    user_ids = list(carts)
+    for index, user_id in enumerate(user_ids):
+        try:
+            await insert_carts_to_db(
+                session=session, carts={user_id: carts[user_id]}, prices=prices
+            )
+        except IntegrityError as ex:
+            logger.warning(ex)
+        except Exception as ex:
+            logger.warning(ex)
+            await redis.sadd(DIRTY_CARTS_KEY, *user_ids[index:])
+            return False
+    return True
+
+
+async def insert_carts_to_db(
+        session: async_sessionmaker[AsyncSession],
+        carts: dict[int, dict[str, str]],
+        prices: dict[str, str | None]
+) -> None:
+    cart_id_query = sa.select(Cart.user_id, Cart.id).where(Cart.user_id.in_(carts))
     async with session.begin() as conn:
-        await conn.execute(query)
+        cart_ids = dict((await conn.execute(cart_id_query)).tuples().all())
+        if not cart_ids:
+            return
+        await conn.execute(
+            sa.delete(CartProduct).where(CartProduct.cart_id.in_(cart_ids.values()))
+        )
+        cart_products = []
+        cart_totals = []
+        for user_id, cart_id in cart_ids.items():
+            # Products without price are deleted or deactivated.
+            items = {
+                product_id: quantity for product_id, quantity in carts[user_id].items()
+                if prices.get(product_id)
+            }
+            cart = calculate_cart(items=items, prices=prices)
+            cart_products.extend(
+                {
+                    "cart_id": cart_id,
+                    "product_id": item["product_id"],
+                    "quantity": item["quantity"]
+                } for item in cart["items"]
+            )
+            cart_totals.append(
+                {
+                    "id": cart_id,
+                    "total_quantity": cart["total_quantity"],
+                    "total_price": cart["total_price"]
+                }
+            )
+        if cart_products:
+            await conn.execute(sa.insert(CartProduct), cart_products)
+        await conn.execute(sa.update(Cart), cart_totals)
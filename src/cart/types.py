@@ -1,21 +1,22 @@
 from typing import NewType, TypedDict
+from decimal import Decimal
+
+from src.products.types import ProductId
 
 # ==================== Models types ==================== #
 
 CartId = NewType("CartId", int)
 
-# ==================== Cart cache key type ==================== #
+# ==================== Query result types ==================== #
 
-class CartPayloadKeyType(TypedDict):
-    user_id: str
-    total_quantity: int
-    total_price: str
+class CartItemResponse(TypedDict):
+    product_id: ProductId
+    quantity: int
+    unit_price: Decimal | None
+    total_price: Decimal | None
 
 
-class MessageJsonType(TypedDict):
-    """
-    Type which comes from message broker.
-    """
-    user_id: str
-    total_quantity: str
-    total_price: str
+class CartResponse(TypedDict):
+    items: list[CartItemResponse]
+    total_quantity: int
+    total_price: Decimal
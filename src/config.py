@@ -21,6 +21,8 @@ class Config(CustomBaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
     APP_VERSION: str = "0.1"
+    HTTP_CACHE_MAX_AGE_SEC: int = 30
+    HTTP_CACHE_STALE_WHILE_REVALIDATE_SEC: int = 300
 
 
 settings = Config() # type: ignore
@@ -59,6 +61,14 @@ class LogConfig(BaseModel):
             'handlers': ['console'],
             'propagate': False,
         },
+        'cart': {
+            'handlers': ['console'],
+            'propagate': False,
+        },
+        'sales': {
+            'handlers': ['console'],
+            'propagate': False,
+        },
         'tickets': {
             'handlers': ['console'],
             'propagate': False,
@@ -71,6 +81,14 @@ class LogConfig(BaseModel):
             'handlers': ['console'],
             'propagate': False,
         },
+        'related': {
+            'handlers': ['console'],
+            'propagate': False,
+        },
+        'home': {
+            'handlers': ['console'],
+            'propagate': False,
+        },
         'pagination': {
             'handlers': ['console'],
             'propagate': False,
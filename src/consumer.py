@@ -1,8 +1,9 @@
 import os
-import json
 import asyncio
+import logging
 
-from io import BytesIO
+from datetime import datetime, timezone
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dotenv import load_dotenv
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import (
@@ -12,12 +13,32 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine
 )
 
-from cart.types import MessageJsonType # type: ignore
-from cart.service import insert_updated_cart_to_db # type: ignore
-from admin.service import process_excel_data # type: ignore
-from s3.utils import get_obj_from_s3 # type: ignore
+from cart.config import cart_config # type: ignore
+from cart.service import sync_dirty_carts # type: ignore
+from sales.config import sales_config # type: ignore
+from sales.service import reconcile_stocks # type: ignore
+from products.config import products_config # type: ignore
+from products.service import ( # type: ignore
+    expire_discounts,
+    refresh_facet_counts,
+    refresh_dirty_facets,
+    create_comment_stream_group,
+    write_buffered_comments,
+    recount_comment_counts
+)
+from admin.config import admin_config # type: ignore
+from admin.service import process_excel_data, process_pending_image # type: ignore
+from s3.config import storage_config # type: ignore
+from s3.service import drain_s3_outbox, collect_orphaned_objects # type: ignore
+from s3.utils import download_to_spooled_file # type: ignore
+from http_cache import CATALOG, bump_cache_version # type: ignore
+from related.config import related_config # type: ignore
+from related.service import refresh_related_articles, refresh_related_products # type: ignore
+from home.config import home_config # type: ignore
+from home.service import refresh_home # type: ignore
 
 load_dotenv()
+logger = logging.getLogger("consumer")
 engine: AsyncEngine = create_async_engine(os.getenv("POSTGRES_URL")) # type: ignore
 
 
@@ -25,35 +46,248 @@ async def get_session() -> async_sessionmaker[AsyncSession]:
     return async_sessionmaker(engine, expire_on_commit=False)
 
 
-async def listen_to_expired_keys() -> None:
-    session = await get_session()
-    client = Redis(
+def get_redis_client() -> Redis:
+    return Redis(
         host=os.getenv("REDIS_HOST"), # type: ignore
         port=int(os.getenv("REDIS_PORT")), # type: ignore
         decode_responses=True
     )
+
+
+async def listen_to_expired_keys() -> None:
+    session = await get_session()
+    client = get_redis_client()
     pubsub = client.pubsub()
-    await pubsub.psubscribe("__keyspace@0__:cart:*")
     await pubsub.psubscribe("__keyspace@0__:file:*")
     async for message in pubsub.listen():
         if message["type"] == "pmessage":
 
-            if message["channel"].startswith("__keyspace@0__:cart:user_id"):
-                message_list: str = message["channel"].split(":", 4)[-1]
-                json_data: MessageJsonType = json.loads(message_list)
-                await insert_updated_cart_to_db(
-                    json_message=json_data,
-                    session=session
-                )
-
             if message["channel"].startswith("__keyspace@0__:file"):
                 filename = message["channel"].split(":")[-1]
-                file = await get_obj_from_s3(filename=filename)
-                await process_excel_data(file=BytesIO(file), session=session)
+                try:
+                    file = await download_to_spooled_file(filename=filename)
+                    try:
+                        await process_excel_data(file=file, session=session)
+                    finally:
+                        file.close()
+                except Exception as ex:
+                    logger.warning(ex)
 
     await pubsub.close()
     await client.close()
 
 
+async def sync_carts_periodically() -> None:
+    """
+    Carts are only mutated in redis, this loop
+    persists dirty carts into db.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    while True:
+        try:
+            await sync_dirty_carts(session=session, redis=client)
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(cart_config.CART_SYNC_INTERVAL_SEC)
+
+
+async def reconcile_stocks_periodically() -> None:
+    """
+    Releasing abandoned stock reservations and
+    mirroring products stock into redis.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    while True:
+        try:
+            await reconcile_stocks(session=session, redis=client)
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(sales_config.STOCK_RECONCILE_INTERVAL_SEC)
+
+
+async def expire_discounts_periodically() -> None:
+    """
+    Keeping Product.effective_price correct
+    once discounts pass their expiry date.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    while True:
+        try:
+            await expire_discounts(session=session, redis=client)
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(products_config.DISCOUNT_EXPIRY_INTERVAL_SEC)
+
+
+async def refresh_facets_periodically() -> None:
+    """
+    Recomputing facet counts of dirty categories, with a full
+    refresh now and then for changes nobody marks (e.g. sales).
+    """
+    session = await get_session()
+    client = get_redis_client()
+    last_full_refresh = 0.0
+    while True:
+        loop_time = asyncio.get_running_loop().time()
+        try:
+            if loop_time - last_full_refresh >= products_config.FACET_FULL_REFRESH_INTERVAL_SEC:
+                if await refresh_facet_counts(session=session):
+                    last_full_refresh = loop_time
+                    await bump_cache_version(client, CATALOG)
+            else:
+                await refresh_dirty_facets(session=session, redis=client)
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(products_config.FACET_REFRESH_INTERVAL_SEC)
+
+
+async def refresh_related_periodically(pool: Executor) -> None:
+    """
+    Giving new articles and products their related lists every
+    interval, and recomputing all lists on the full refresh.
+    """
+    session = await get_session()
+    last_full_refresh = 0.0
+    last_refresh: datetime | None = None
+    while True:
+        started_at = datetime.now(timezone.utc)
+        loop_time = asyncio.get_running_loop().time()
+        since = last_refresh
+        if loop_time - last_full_refresh >= related_config.RELATED_FULL_REFRESH_INTERVAL_SEC:
+            since = None
+        try:
+            refreshed = all([
+                await refresh_related_articles(session=session, since=since),
+                await refresh_related_products(session=session, pool=pool, since=since)
+            ])
+            if refreshed:
+                last_refresh = started_at
+                if since is None:
+                    last_full_refresh = loop_time
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(related_config.RELATED_REFRESH_INTERVAL_SEC)
+
+
+async def refresh_home_periodically() -> None:
+    """
+    Keeping the homepage payload in step with its sections,
+    sections invalidated since the last run are rebuilt alone.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    assembled: dict[str, bytes] = {}
+    while True:
+        try:
+            assembled = await refresh_home(session=session, redis=client, assembled=assembled)
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(home_config.HOME_REFRESH_INTERVAL_SEC)
+
+
+async def write_buffered_comments_continuously() -> None:
+    """
+    Bulk inserting comments buffered in the redis stream,
+    unacknowledged ones are retried before new ones are read.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    await create_comment_stream_group(client)
+    backlog = True
+    while True:
+        try:
+            read = await write_buffered_comments(session=session, redis=client, backlog=backlog)
+        except Exception as ex:
+            logger.warning(ex)
+            read = None
+        if read is None:
+            backlog = True
+            await asyncio.sleep(products_config.COMMENT_BUFFER_RETRY_SEC)
+        elif backlog and read == 0:
+            backlog = False
+
+
+async def recount_comments_periodically() -> None:
+    """
+    Correcting comment counters which
+    cascaded comment deletes left behind.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    while True:
+        try:
+            await recount_comment_counts(session=session, redis=client)
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(products_config.COMMENT_RECOUNT_INTERVAL_SEC)
+
+
+async def process_images(pool: Executor) -> None:
+    """
+    Generating resized variants of uploaded product images.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    while True:
+        try:
+            await process_pending_image(session=session, redis=client, pool=pool)
+        except Exception as ex:
+            logger.warning(ex)
+            await asyncio.sleep(1)
+
+
+async def drain_s3_outbox_periodically() -> None:
+    """
+    Applying s3 deletes and upload checks committed with db changes,
+    full batches are followed immediately by the next one.
+    """
+    session = await get_session()
+    while True:
+        try:
+            drained = await drain_s3_outbox(session=session)
+        except Exception as ex:
+            logger.warning(ex)
+            drained = 0
+        if drained < storage_config.OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(storage_config.OUTBOX_POLL_INTERVAL_SEC)
+
+
+async def collect_orphaned_objects_periodically() -> None:
+    """
+    Deleting bucket objects which no row references.
+    """
+    session = await get_session()
+    client = get_redis_client()
+    while True:
+        try:
+            await collect_orphaned_objects(
+                session=session, redis=client, dry_run=storage_config.ORPHAN_GC_DRY_RUN
+            )
+        except Exception as ex:
+            logger.warning(ex)
+        await asyncio.sleep(storage_config.ORPHAN_GC_INTERVAL_SEC)
+
+
+async def main() -> None:
+    with ProcessPoolExecutor(max_workers=admin_config.IMAGE_PROCESS_WORKERS) as pool:
+        await asyncio.gather(
+            listen_to_expired_keys(),
+            sync_carts_periodically(),
+            reconcile_stocks_periodically(),
+            expire_discounts_periodically(),
+            refresh_facets_periodically(),
+            drain_s3_outbox_periodically(),
+            collect_orphaned_objects_periodically(),
+            refresh_related_periodically(pool),
+            refresh_home_periodically(),
+            recount_comments_periodically(),
+            *[process_images(pool) for _ in range(admin_config.IMAGE_PROCESS_WORKERS)],
+            *([write_buffered_comments_continuously()] if products_config.COMMENT_BUFFER_ENABLED else [])
+        )
+
+
 if __name__ == "__main__":
-    asyncio.run(listen_to_expired_keys())
+    asyncio.run(main())
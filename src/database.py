@@ -14,6 +14,7 @@ from src.sales import types as sale_types
 from src.admin import types as admin_types
 from src.tickets import types as ticket_types
 from src.articles import types as article_types
+from src.s3 import types as s3_types
 
 POSTGRES_URL = str(settings.POSTGRES_URL)
 
@@ -43,7 +44,8 @@ class Base(MappedAsDataclass, DeclarativeBase):
         article_types.ArticleImageId: INTEGER,
         article_types.RatingId: INTEGER,
         article_types.ArticleCommentId: INTEGER,
-        article_types.GlossaryId: INTEGER
+        article_types.GlossaryId: INTEGER,
+        s3_types.OutboxId: INTEGER
     }
 
 
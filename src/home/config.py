@@ -0,0 +1,15 @@
+from pydantic_settings import BaseSettings
+
+
+class HomeConfig(BaseSettings):
+    # The consumer rebuilds the payload at least this often,
+    # the ttl only matters if the consumer is down.
+    HOME_REFRESH_INTERVAL_SEC: int = 10
+    HOME_CACHE_TTL_SEC: int = 300
+    # One api worker holding the lock refills section keys every
+    # interval, those expiring within the margin are refilled early.
+    CACHE_WARM_INTERVAL_SEC: int = 15
+    CACHE_WARM_MARGIN_SEC: int = 45
+    CACHE_WARM_LOCK_TTL_SEC: int = 60
+
+home_config = HomeConfig() # type: ignore
@@ -0,0 +1,40 @@
+from typing import Annotated
+from redis.asyncio import Redis
+from datetime import datetime, timezone
+from fastapi import APIRouter, status, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database import get_redis, get_session
+from src.http_cache import cache_policy
+from src.responses import cached_body, json_response
+from src.home import service
+from src.home.config import home_config
+from src.home.schemas import HomePage
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    dependencies=[cache_policy()],
+    status_code=status.HTTP_200_OK,
+    response_model=HomePage,
+    description="Every homepage section in one payload, refreshed by the consumer."
+)
+async def home(
+    request: Request,
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
+) -> Response:
+    if cached := await cached_body(
+        redis=redis, key=service.HOME_KEY, ttl=home_config.HOME_CACHE_TTL_SEC
+    ):
+        body, last_modified = cached
+        return json_response(request=request, body=body, last_modified=last_modified)
+
+    body = await service.build_home(session=session, redis=redis)
+    return json_response(
+        request=request,
+        body=body,
+        last_modified=datetime.now(timezone.utc).replace(microsecond=0)
+    )
@@ -0,0 +1,26 @@
+from typing import Annotated
+from pydantic import Field
+
+from src.schemas import CustomBaseModel
+from src.admin.schemas import Brand
+from src.products.schemas import MostViewedProducts, NewestProducts
+from src.articles.schemas import ArticleMostViewed, ArticleNewest, ArticlePopular
+
+
+class RootCategory(CustomBaseModel):
+    id: int
+    name: str
+
+
+class HomePage(CustomBaseModel):
+    """
+    Documents the payload only, it is assembled from already
+    serialized section bodies and never validated against this.
+    """
+    most_viewed_products: Annotated[list[MostViewedProducts], Field(alias="mostViewedProducts")]
+    newest_products: Annotated[list[NewestProducts], Field(alias="newestProducts")]
+    active_brands: Annotated[list[Brand], Field(alias="activeBrands")]
+    root_categories: Annotated[list[RootCategory], Field(alias="rootCategories")]
+    newest_articles: Annotated[list[ArticleNewest], Field(alias="newestArticles")]
+    popular_articles: Annotated[list[ArticlePopular], Field(alias="popularArticles")]
+    most_viewed_articles: Annotated[list[ArticleMostViewed], Field(alias="mostViewedArticles")]
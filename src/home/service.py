@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import orjson
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.responses import fill_cached_body
+from src.home.config import home_config
+from src.home.types import HomeSection
+from src.admin.schemas import Brand
+from src.products import service as products_service
+from src.products import schemas as products_schemas
+from src.products.config import products_config
+from src.articles import service as articles_service
+from src.articles import schemas as articles_schemas
+from src.articles.config import article_config
+
+logger = logging.getLogger("home")
+
+HOME_KEY = "home"
+CACHE_WARMER_LOCK_KEY = "cache-warmer-lock"
+
+HOME_SECTIONS: dict[str, HomeSection] = {
+    "mostViewedProducts": HomeSection(
+        key="most-viewed-products",
+        ttl=products_config.MOST_VIEWED_PRODUCTS_CACHE_TTL,
+        fetch=products_service.most_viewed_products,
+        response_model=list[products_schemas.MostViewedProducts]
+    ),
+    "newestProducts": HomeSection(
+        key="newest-products",
+        ttl=products_config.NEWEST_PRODUCTS_CACHE_TTL,
+        fetch=products_service.newest_products,
+        response_model=list[products_schemas.NewestProducts]
+    ),
+    "activeBrands": HomeSection(
+        key="brand-list",
+        ttl=products_config.BRANDS_CACHE_TTL,
+        fetch=products_service.active_brands,
+        response_model=list[Brand]
+    ),
+    "rootCategories": HomeSection(
+        key="root-categories",
+        ttl=products_config.ROOT_CATEGORIES_CACHE_TTL,
+        fetch=products_service.root_categories
+    ),
+    "newestArticles": HomeSection(
+        key="newest_articles",
+        ttl=article_config.NEWEST_ARTICLES_CACHE_TTL,
+        fetch=articles_service.newest_articles,
+        response_model=list[articles_schemas.ArticleNewest]
+    ),
+    "popularArticles": HomeSection(
+        key="popular_articles",
+        ttl=article_config.POPULAR_ARTICLES_CACHE_TTL,
+        fetch=articles_service.popular_articles,
+        response_model=list[articles_schemas.ArticlePopular]
+    ),
+    "mostViewedArticles": HomeSection(
+        key="most_viewed_articles",
+        ttl=article_config.MOST_VIEWED_ARTICLES_CACHE_TTL,
+        fetch=articles_service.most_viewed_articles,
+        response_model=list[articles_schemas.ArticleMostViewed]
+    )
+}
+
+
+def assemble_home(bodies: dict[str, bytes]) -> bytes:
+    """
+    Section bodies are already serialized, so the payload is
+    put together from their bytes without parsing them again.
+    """
+    return b"{" + b",".join(
+        orjson.dumps(name) + b":" + body for name, body in bodies.items()
+    ) + b"}"
+
+
+async def section_bodies(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        previous: dict[str, bytes] | None = None
+) -> dict[str, bytes]:
+    """
+    Every section from its own redis key in one round trip, only the
+    sections whose keys were deleted or expired are queried again.
+    A failing section keeps its previous body.
+    """
+    previous = previous or {}
+    async with redis.pipeline(transaction=False) as pipe:
+        for section in HOME_SECTIONS.values():
+            pipe.get(section.key)
+        cached = await pipe.execute()
+
+    bodies: dict[str, bytes] = {}
+    for (name, section), body in zip(HOME_SECTIONS.items(), cached):
+        if body is not None:
+            bodies[name] = body.encode()
+            continue
+        try:
+            bodies[name] = await fill_cached_body(
+                redis=redis,
+                key=section.key,
+                ttl=section.ttl,
+                fetch=lambda section=section: section.fetch(session),
+                response_model=section.response_model
+            )
+        except Exception as ex:
+            logger.warning(ex)
+            bodies[name] = previous.get(name, b"[]")
+    return bodies
+
+
+async def build_home(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> bytes:
+    body = assemble_home(await section_bodies(session=session, redis=redis))
+    await redis.set(name=HOME_KEY, value=body, ex=home_config.HOME_CACHE_TTL_SEC)
+    return body
+
+# ==================== Consumer side ==================== #
+
+async def refresh_home(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        assembled: dict[str, bytes]
+) -> dict[str, bytes]:
+    """
+    Rewriting the payload when a section changed since it was
+    assembled, e.g. an admin change deleted its key or it expired,
+    or before the payload itself expires.
+    Returns the section bodies the payload is now made of.
+    """
+    bodies = await section_bodies(session=session, redis=redis, previous=assembled)
+    remaining_ttl = await redis.ttl(HOME_KEY)
+    if bodies != assembled or remaining_ttl < 2 * home_config.HOME_REFRESH_INTERVAL_SEC:
+        await redis.set(
+            name=HOME_KEY, value=assemble_home(bodies), ex=home_config.HOME_CACHE_TTL_SEC
+        )
+    return bodies
+
+# ==================== Cache warmer ==================== #
+
+async def warm_sections(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Refilling section keys which are missing or expire within
+    CACHE_WARM_MARGIN_SEC, so requests never rebuild them. The margin
+    is at most half of a section's ttl, short ttls are not refilled
+    every round.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for section in HOME_SECTIONS.values():
+            pipe.ttl(section.key)
+        remaining_ttls = await pipe.execute()
+
+    for section, remaining_ttl in zip(HOME_SECTIONS.values(), remaining_ttls):
+        # -2 is a missing key, -1 one without a ttl which never expires.
+        margin = min(home_config.CACHE_WARM_MARGIN_SEC, section.ttl // 2)
+        if remaining_ttl == -1 or remaining_ttl > margin:
+            continue
+        try:
+            await fill_cached_body(
+                redis=redis,
+                key=section.key,
+                ttl=section.ttl,
+                fetch=lambda section=section: section.fetch(session),
+                response_model=section.response_model
+            )
+        except Exception as ex:
+            logger.warning(ex)
+
+
+async def run_cache_warmer(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Started by every api worker, only the holder of the lock warms.
+    The holder extends the lock each round, if it dies the lock
+    expires and another worker takes over.
+    """
+    lock = redis.lock(
+        CACHE_WARMER_LOCK_KEY, timeout=home_config.CACHE_WARM_LOCK_TTL_SEC
+    )
+    try:
+        while True:
+            try:
+                if await lock.owned():
+                    await lock.reacquire()
+                    await warm_sections(session=session, redis=redis)
+                elif await lock.acquire(blocking=False):
+                    await warm_sections(session=session, redis=redis)
+            except Exception as ex:
+                logger.warning(ex)
+            await asyncio.sleep(home_config.CACHE_WARM_INTERVAL_SEC)
+    finally:
+        if await lock.owned():
+            await lock.release()
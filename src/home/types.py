@@ -0,0 +1,13 @@
+from typing import Any, Awaitable, Callable, NamedTuple
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+class HomeSection(NamedTuple):
+    """
+    A homepage section, backed by the same redis key
+    as the route serving it on its own.
+    """
+    key: str
+    ttl: int
+    fetch: Callable[[async_sessionmaker[AsyncSession]], Awaitable[Any]]
+    response_model: Any | None = None
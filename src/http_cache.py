@@ -0,0 +1,165 @@
+import time
+
+from typing import Annotated, NamedTuple
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+from src.database import get_redis
+from src.responses import etag_matches
+
+CATALOG = "catalog"
+ARTICLES = "articles"
+
+
+class CachePolicy(NamedTuple):
+    max_age: int
+    stale_while_revalidate: int
+    scope: str | None = None
+
+    @property
+    def cache_control(self) -> str:
+        return (
+            f"public, max-age={self.max_age}, "
+            f"stale-while-revalidate={self.stale_while_revalidate}"
+        )
+
+
+class NotModified(HTTPException):
+    def __init__(self, headers: dict[str, str]) -> None:
+        self.status_code = status.HTTP_304_NOT_MODIFIED
+        self.detail = ""
+        self.headers = headers
+
+
+def cache_version_key(scope: str) -> str:
+    return f"cache-version:{scope}"
+
+
+def version_epoch() -> int:
+    """
+    Starting value of a missing version, e.g. after a redis flush.
+    It is larger than any version handed out before the flush
+    (an older epoch plus its bumps), so old ETags never match again.
+    """
+    return time.time_ns()
+
+
+async def get_cache_version(redis: Redis, scope: str) -> str:
+    key = cache_version_key(scope)
+    if (version := await redis.get(key)) is not None:
+        return version
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(key, version_epoch(), nx=True)
+        pipe.get(key)
+        _, version = await pipe.execute()
+    return version
+
+
+async def bump_cache_version(redis: Redis, *scopes: str) -> None:
+    """
+    Invalidating every ETag handed out for the given scopes,
+    called once the change is committed.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for scope in scopes:
+            pipe.set(cache_version_key(scope), version_epoch(), nx=True)
+            pipe.incr(cache_version_key(scope))
+        await pipe.execute()
+
+
+def cache_policy(
+        scope: str | None = None,
+        max_age: int | None = None,
+        stale_while_revalidate: int | None = None
+):
+    """
+    Route dependency declaring how a GET route may be cached.
+    With a scope, the weak ETag is the scope's version counter, so
+    If-None-Match is answered with 304 from one redis GET before
+    the route touches the db. Routes without a scope only get
+    Cache-Control, e.g. ones already sending an ETag of their body.
+    """
+    policy = CachePolicy(
+        max_age=settings.HTTP_CACHE_MAX_AGE_SEC if max_age is None else max_age,
+        stale_while_revalidate=(
+            settings.HTTP_CACHE_STALE_WHILE_REVALIDATE_SEC
+            if stale_while_revalidate is None else stale_while_revalidate
+        ),
+        scope=scope
+    )
+
+    async def check_conditional_request(
+            request: Request,
+            redis: Annotated[Redis, Depends(get_redis)]
+    ) -> None:
+        request.state.cache_policy = policy
+        if policy.scope is None:
+            return
+        version = await get_cache_version(redis=redis, scope=policy.scope)
+        etag = f'W/"{policy.scope}-{version}"'
+        request.state.etag = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise NotModified(
+                headers={"ETag": etag, "Cache-Control": policy.cache_control}
+            )
+
+    return Depends(check_conditional_request)
+
+
+class HttpCacheMiddleware:
+    """
+    Adding the route's Cache-Control and ETag to GET responses, and
+    bumping cache versions after successful writes under the paths
+    of invalidations, e.g. {"/admin/": (CATALOG, ARTICLES)}.
+    """
+    def __init__(
+            self,
+            app: ASGIApp,
+            invalidations: dict[str, tuple[str, ...]]
+    ) -> None:
+        self.app = app
+        self.invalidations = invalidations
+        self.redis = Redis(
+            host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in ("GET", "HEAD"):
+            async def send_with_cache_headers(message: Message) -> None:
+                if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                    state = scope.get("state", {})
+                    if policy := state.get("cache_policy"):
+                        headers = MutableHeaders(scope=message)
+                        headers.setdefault("Cache-Control", policy.cache_control)
+                        if etag := state.get("etag"):
+                            headers.setdefault("ETag", etag)
+                await send(message)
+
+            await self.app(scope, receive, send_with_cache_headers)
+            return
+
+        invalidated_scopes = {
+            cache_scope
+            for path, cache_scopes in self.invalidations.items()
+            if scope["path"].startswith(path)
+            for cache_scope in cache_scopes
+        }
+        if not invalidated_scopes:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_after_invalidation(message: Message) -> None:
+            # The route has committed by the time its response starts.
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 300:
+                await bump_cache_version(self.redis, *invalidated_scopes)
+            await send(message)
+
+        await self.app(scope, receive, send_after_invalidation)
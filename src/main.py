@@ -1,18 +1,26 @@
+import asyncio
 import logging
 from logging.config import dictConfig
 
 from typing import AsyncGenerator
 from fastapi import FastAPI
+from redis.asyncio import Redis
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from src.config import LogConfig, app_configs, settings
+from src.database import get_session
+from src.http_cache import ARTICLES, CATALOG, HttpCacheMiddleware
+from src.home.service import run_cache_warmer
 from src.auth import router as auth_router
 from src.admin import router as admin_router
 from src.products import router as products_router
 from src.cart import router as cart_router
+from src.sales import router as sales_router
 from src.tickets import router as ticket_router
 from src.articles import router as article_router
+from src.home import router as home_router
 
 logger = logging.getLogger("root")
 
@@ -21,10 +29,24 @@ logger = logging.getLogger("root")
 async def lifespan(_application: FastAPI) -> AsyncGenerator:
     dictConfig(LogConfig().model_dump())
     logger.info("App is running...")
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True)
+    cache_warmer = asyncio.create_task(
+        run_cache_warmer(session=await get_session(), redis=redis)
+    )
     yield
+    cache_warmer.cancel()
+    try:
+        await cache_warmer
+    except asyncio.CancelledError:
+        pass
+    await redis.aclose()
 
 
-app = FastAPI(**app_configs, lifespan=lifespan)
+app = FastAPI(
+    **app_configs,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 origins = settings.CORS_ORIGINS.split(",")
 
@@ -36,9 +58,20 @@ app.add_middleware(
     allow_headers=['*']
 )
 
+app.add_middleware(
+    HttpCacheMiddleware,
+    invalidations={
+        "/admin/": (CATALOG, ARTICLES),
+        "/sales/checkout/": (CATALOG,),
+        "/articles/article-rating/": (ARTICLES,)
+    }
+)
+
 app.include_router(router=auth_router.router, prefix="/auth", tags=["auth"])
 app.include_router(router=admin_router.router, prefix="/admin", tags=["admin"])
 app.include_router(router=products_router.router, prefix="/products", tags=["products"])
 app.include_router(router=cart_router.router, prefix="/cart", tags=["cart"])
+app.include_router(router=sales_router.router, prefix="/sales", tags=["sales"])
 app.include_router(router=ticket_router.router, prefix="/tickets", tags=["tickets"])
 app.include_router(router=article_router.router, prefix="/articles", tags=["articles"])
+app.include_router(router=home_router.router, prefix="/home", tags=["home"])
@@ -1,10 +1,14 @@
 from typing import Any
+import base64
+import binascii
 import logging
+import orjson
 import sqlalchemy as sa
 
-from fastapi import Query
+from datetime import datetime
+from fastapi import HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncEngine
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import TypeVar, Generic, Annotated
 
 T = TypeVar("T")
@@ -17,11 +21,29 @@ class PaginatedResponse(BaseModel, Generic[T]):
     items: list[T]
 
 
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    count: int
+    items: list[T]
+    next_cursor: Annotated[str | None, Field(serialization_alias="nextCursor")] = None
+
+
 class PaginationQuerySchema(BaseModel):
     limit: int
     offset: int
 
 
+class CursorQuerySchema(BaseModel):
+    limit: int
+    # (created_at, id) of the last row of the previous page.
+    after: tuple[datetime, int] | None = None
+
+
+class InvalidCursor(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Invalid cursor!"
+
+
 async def pagination_query(
         page: Annotated[int, Query(ge=1)] = 1,
         per_page: Annotated[int, Query(alias="perPage")] = 10
@@ -53,4 +75,54 @@ async def paginate(
     except Exception as ex:
         logger.error(ex)
         return None
-    
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(
+        orjson.dumps([created_at.isoformat(), row_id])
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, row_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise InvalidCursor
+
+
+async def cursor_query(
+        cursor: Annotated[str | None, Query()] = None,
+        per_page: Annotated[int, Query(alias="perPage", ge=1, le=100)] = 10
+) -> CursorQuerySchema:
+    """
+    Dependency for getting cursor and per_page from query
+    parameters, cursor is the nextCursor of the previous page.
+    """
+    return CursorQuerySchema(
+        limit=per_page,
+        after=decode_cursor(cursor) if cursor is not None else None
+    )
+
+
+def keyset_paginate(
+        query: sa.Select,
+        created_at: sa.ColumnElement,
+        row_id: sa.ColumnElement,
+        limit: int,
+        after: tuple[datetime, int] | None
+) -> sa.Select:
+    """
+    Newest first page of query after the cursor, seeking on
+    (created_at, id) instead of skipping rows with offset.
+    One extra row is fetched to tell whether a next page exists.
+    """
+    if after is not None:
+        query = query.where(sa.tuple_(created_at, row_id) < sa.tuple_(*after))
+    return query.order_by(created_at.desc(), row_id.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: list, limit: int) -> str | None:
+    if len(rows) <= limit:
+        return None
+    return encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id)
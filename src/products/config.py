@@ -5,6 +5,25 @@ class ProductsConfig(BaseSettings):
     BRANDS_CACHE_TTL: int
     ROOT_CATEGORIES_CACHE_TTL: int
     SUB_CATEGORIES_CACHE_TTL: int
+    MOST_VIEWED_PRODUCTS_CACHE_TTL: int = 180
+    NEWEST_PRODUCTS_CACHE_TTL: int = 1020
+    DISCOUNT_EXPIRY_INTERVAL_SEC: int = 3600
+    FACET_REFRESH_INTERVAL_SEC: int = 30
+    FACET_FULL_REFRESH_INTERVAL_SEC: int = 900
+    FACET_LATENCY_BUDGET_MS: int = 150
+    PRICE_FACET_BOUNDARIES: list[int] = [0, 10_000_000, 50_000_000, 100_000_000, 500_000_000]
+    # Product and article comments go through a redis stream which the
+    # consumer writes in batches, instead of one transaction per comment.
+    COMMENT_BUFFER_ENABLED: bool = False
+    COMMENT_BUFFER_BATCH_SIZE: int = 500
+    COMMENT_BUFFER_BLOCK_MS: int = 1000
+    COMMENT_BUFFER_RETRY_SEC: int = 5
+    # Safety net for a poster's pending comments if the consumer is down.
+    COMMENT_PENDING_TTL_SEC: int = 3600
+    # How long an existing product or article is trusted before buffering.
+    COMMENT_TARGET_CACHE_TTL_SEC: int = 300
+    # comment_count is recounted for comments removed by cascades (e.g. user deletes).
+    COMMENT_RECOUNT_INTERVAL_SEC: int = 24 * 60 * 60
 
 
 products_config = ProductsConfig() # type: ignore
\ No newline at end of file
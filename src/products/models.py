@@ -60,6 +60,7 @@ class Product(Base):
         sa.CheckConstraint("views >= 0", name="check_positive_views"),
         sa.CheckConstraint("price >= 0", name="check_positive_price"),
         sa.CheckConstraint("discount BETWEEN 0 AND 100", name="check_discount_percent"),
+        sa.CheckConstraint("effective_price >= 0", name="check_positive_effective_price"),
         sa.Index("idx_active_products", "is_active", postgresql_where=sa.text("is_active = TRUE"))
     )
 
@@ -71,10 +72,19 @@ class Product(Base):
     price: so.Mapped[Decimal] = so.mapped_column(sa.DECIMAL(20, 3))
     discount: so.Mapped[int | None]
     expiry_discount: so.Mapped[date | None] = so.mapped_column(sa.TIMESTAMP(timezone=True))
+    # Price after the active discount, kept in sync on write and by
+    # the consumer when expiry_discount passes, so listings can filter
+    # and sort on an index instead of computing it per row.
+    effective_price: so.Mapped[Decimal] = so.mapped_column(sa.DECIMAL(20, 3), index=True)
     created_at: so.Mapped[datetime] = so.mapped_column(
         sa.TIMESTAMP(timezone=True), server_default=sa.func.now()
     )
     views: so.Mapped[int] = so.mapped_column(default=0, init=False)
+    # Maintained with comment writes so listings never count comments,
+    # the consumer recounts it for comments deleted with their user.
+    comment_count: so.Mapped[int] = so.mapped_column(
+        default=0, server_default="0", init=False
+    )
     is_active: so.Mapped[bool] = so.mapped_column(default=True, init=False)
 
     brand_id: so.Mapped[types.BrandId | None] = so.mapped_column(sa.ForeignKey(
@@ -92,11 +102,15 @@ class ProductImage(Base):
     __tablename__ = "productimages"
 
     id: so.Mapped[types.ProductImageId] = so.mapped_column(autoincrement=True, primary_key=True)
-    url: so.Mapped[str] = so.mapped_column(sa.String(250))
+    url: so.Mapped[str] = so.mapped_column(sa.String(250), index=True)
 
     product_id: so.Mapped[types.ProductId] = so.mapped_column(sa.ForeignKey(
         f"{Product.__tablename__}.id", ondelete="CASCADE"
     ), index=True)
+    # Set by the consumer once resized variants of url are stored in s3.
+    variants_ready: so.Mapped[bool] = so.mapped_column(
+        default=False, server_default=sa.false(), init=False
+    )
 
     def __repr__(self) -> str:
         return f"{self.id} {self.url}"
@@ -130,13 +144,18 @@ class CategoryAttribute(Base):
 
 class AttributeValue(Base):
     __tablename__ = "attributevalues"
+    __table_args__ = (
+        # Covers "attribute = value" filters, product_id is included
+        # so matching products come from an index only scan.
+        sa.Index("idx_attribute_value_product", "attribute_name", "value", "product_id"),
+    )
 
     id: so.Mapped[types.AttributeValueId] = so.mapped_column(autoincrement=True, primary_key=True)
     value: so.Mapped[str | None] = so.mapped_column(sa.String(200))
 
     attribute_name: so.Mapped[str] = so.mapped_column(sa.ForeignKey(
         f"{Attribute.__tablename__}.name", ondelete="CASCADE"
-    ), index=True)
+    ))
     product_id: so.Mapped[types.ProductId | None] = so.mapped_column(sa.ForeignKey(
         f"{Product.__tablename__}.id", ondelete="CASCADE"
     ), index=True)
@@ -145,8 +164,34 @@ class AttributeValue(Base):
         return f"attribute_name: {self.attribute_name}, product_id: {self.product_id}"
 
 
+class FacetCount(Base):
+    """
+    Product counts per category and facet value, recomputed by
+    the consumer for dirty categories so listings never GROUP BY.
+    name is the attribute name for "attribute" facets, empty otherwise.
+    """
+    __tablename__ = "facetcounts"
+    __table_args__ = (
+        sa.PrimaryKeyConstraint("category_id", "facet", "name", "value"),
+    )
+
+    category_id: so.Mapped[types.CategoryId] = so.mapped_column(sa.ForeignKey(
+        f"{Category.__tablename__}.id", ondelete="CASCADE"
+    ))
+    facet: so.Mapped[str] = so.mapped_column(sa.String(50))
+    name: so.Mapped[str] = so.mapped_column(sa.String(200))
+    value: so.Mapped[str] = so.mapped_column(sa.String(200))
+    count: so.Mapped[int]
+
+    def __repr__(self) -> str:
+        return f"category_id: {self.category_id}, {self.facet} {self.name} {self.value}"
+
+
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        sa.Index("idx_product_comments_keyset", "product_id", "created_at", "id"),
+    )
 
     id: so.Mapped[types.CommentId] = so.mapped_column(autoincrement=True, primary_key=True)
     message: so.Mapped[str] = so.mapped_column(sa.Text)
@@ -156,7 +201,7 @@ class Comment(Base):
 
     product_id: so.Mapped[types.ProductId] = so.mapped_column(sa.ForeignKey(
         f"{Product.__tablename__}.id", ondelete="CASCADE"
-    ), index=True)
+    ))
     user_id: so.Mapped[UserId] = so.mapped_column(sa.ForeignKey(
         f"{User.__tablename__}.id", ondelete="CASCADE"
     ), index=True)
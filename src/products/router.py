@@ -1,23 +1,33 @@
 from typing import Annotated
 from redis.asyncio import Redis
-from fastapi import APIRouter, status, Depends, Query
+from fastapi import APIRouter, status, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, AsyncEngine
 
 from src.database import get_redis, get_session, get_engine
-from src.pagination import PaginatedResponse, PaginationQuerySchema, pagination_query
+from src.http_cache import CATALOG, cache_policy
+from src.pagination import (
+    CursorQuerySchema,
+    PaginationQuerySchema,
+    cursor_query,
+    pagination_query
+)
+from src.responses import cached_json_response
 from src.products import service
 from src.products import schemas
+from src.products.config import products_config
+from src.related import service as related_service
 from src.products.types import (
     ProductId,
     SerialNumber,
     CommentId,
-    CommentListResponse,
+    CommentPageResponse,
     UserProductDetailResponse
 )
 from src.admin.schemas import Brand
 from src.admin.types import GuarantySerial
 from src.auth.models import User
-from src.auth.dependencies import get_current_active_user
+from src.auth.dependencies import get_current_active_user, get_optional_user_id
+from src.auth.types import UserId
 from src.admin.schemas import ProductQuerySearch
 
 router = APIRouter()
@@ -26,22 +36,28 @@ router = APIRouter()
 
 @router.get(
     "/active-brands/",
+    dependencies=[cache_policy()],
     status_code=status.HTTP_200_OK,
     response_model=list[Brand]
 )
 async def active_brands(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
-):
-    result = await service.active_brands(
-        session=session,
-        redis=redis
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="brand-list",
+        ttl=products_config.BRANDS_CACHE_TTL,
+        fetch=lambda: service.active_brands(session=session),
+        response_model=list[Brand]
     )
-    return result
 
 
 @router.get(
     "/search-brands/",
+    dependencies=[cache_policy(CATALOG)],
     status_code=status.HTTP_200_OK,
     response_model=list[str]
 )
@@ -59,6 +75,7 @@ async def search_brand_by_name(
 
 @router.get(
     "/search-categories/",
+    dependencies=[cache_policy(CATALOG)],
     status_code=status.HTTP_200_OK,
     response_model=list[str]
 )
@@ -75,37 +92,47 @@ async def search_category_by_name(
 
 @router.get(
     "/root-categories/",
+    dependencies=[cache_policy()],
     status_code=status.HTTP_200_OK
 )
 async def root_categories(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
-) -> list:
-    result = await service.root_categories(
-        session=session, redis=redis
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="root-categories",
+        ttl=products_config.ROOT_CATEGORIES_CACHE_TTL,
+        fetch=lambda: service.root_categories(session=session)
     )
-    return result
 
 
 @router.get(
     "/sub-categories/{parent_id}/",
+    dependencies=[cache_policy()],
     status_code=status.HTTP_200_OK
 )
 async def sub_categories(
+    request: Request,
     parent_id: int,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
-) -> list:
-    result = await service.sub_categories(
-        session=session,
+) -> Response:
+    return await cached_json_response(
+        request=request,
         redis=redis,
-        parent_id=parent_id
+        key=f"sub-categories:{parent_id}",
+        ttl=products_config.SUB_CATEGORIES_CACHE_TTL,
+        fetch=lambda: service.sub_categories(session=session, parent_id=parent_id),
+        cache_empty=False
     )
-    return result
 
 
 @router.get(
     "/list-assigned-attributes/{category_name}/",
+    dependencies=[cache_policy(CATALOG)],
     status_code=status.HTTP_200_OK
 )
 async def list_assigned_attributes(
@@ -122,6 +149,7 @@ async def list_assigned_attributes(
 
 @router.get(
         "/search-attribute/",
+        dependencies=[cache_policy(CATALOG)],
         status_code=status.HTTP_200_OK
 )
 async def search_attribute(
@@ -143,30 +171,52 @@ async def create_comment(
     product_id: ProductId,
     payload: schemas.CommentIn,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
     user: Annotated[User, Depends(get_current_active_user)]
 ) -> dict:
-    await service.create_comment(
-        session=session,
-        product_id=product_id,
-        payload=payload,
-        user_id=user.id
-    )
+    if products_config.COMMENT_BUFFER_ENABLED:
+        await service.buffer_comment(
+            session=session,
+            redis=redis,
+            kind="product",
+            target_id=product_id,
+            user_id=user.id,
+            username=user.username,
+            message=payload.message
+        )
+    else:
+        await service.create_comment(
+            session=session,
+            product_id=product_id,
+            payload=payload,
+            user_id=user.id
+        )
     return {"detail": "Created successfully."}
 
 
 @router.get(
     "/list-comments/{product_id}/",
     status_code=status.HTTP_200_OK,
-    response_model=list[schemas.CommentList]
+    response_model=schemas.CommentPage
 )
 async def list_comments(
     product_id: ProductId,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
-) -> list[CommentListResponse]:
+    redis: Annotated[Redis, Depends(get_redis)],
+    cursor_info: Annotated[CursorQuerySchema, Depends(cursor_query)],
+    user_id: Annotated[UserId | None, Depends(get_optional_user_id)]
+) -> CommentPageResponse:
     result = await service.list_comments(
         product_id=product_id,
-        session=session
+        session=session,
+        limit=cursor_info.limit,
+        after=cursor_info.after
     )
+    if products_config.COMMENT_BUFFER_ENABLED and user_id is not None and cursor_info.after is None:
+        pending = await service.pending_comments(
+            redis=redis, kind="product", target_id=product_id, user_id=user_id
+        )
+        result = service.merge_pending_comments(page=result, pending=pending)
     return result
 
 
@@ -189,8 +239,9 @@ async def delete_my_comment(
 
 @router.get(
     "/list-products/",
+    dependencies=[cache_policy(CATALOG)],
     status_code=status.HTTP_200_OK,
-    response_model=PaginatedResponse[schemas.UsersProductList]
+    response_model=schemas.UsersProductListPage
 )
 async def list_products(
     filter_query: Annotated[ProductQuerySearch, Query()],
@@ -214,9 +265,11 @@ async def list_products(
 async def product_detail(
     product_serial: SerialNumber,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> UserProductDetailResponse:
     result = await service.product_detail(
         session=session,
+        redis=redis,
         product_serial=product_serial
     )
     return result
@@ -224,31 +277,58 @@ async def product_detail(
 
 @router.get(
     "/most-viewed/",
+    dependencies=[cache_policy()],
     status_code=status.HTTP_200_OK,
     response_model=list[schemas.MostViewedProducts]
 )
 async def most_viewed_products(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
-):
-    return await service.most_viewed_products(
-        session=session,
-        redis=redis
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="most-viewed-products",
+        ttl=products_config.MOST_VIEWED_PRODUCTS_CACHE_TTL,
+        fetch=lambda: service.most_viewed_products(session=session),
+        response_model=list[schemas.MostViewedProducts]
     )
 
 
 @router.get(
     "/newest/",
+    dependencies=[cache_policy()],
     status_code=status.HTTP_200_OK,
     response_model=list[schemas.NewestProducts]
 )
 async def newest_products(
+    request: Request,
     session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
     redis: Annotated[Redis, Depends(get_redis)]
+) -> Response:
+    return await cached_json_response(
+        request=request,
+        redis=redis,
+        key="newest-products",
+        ttl=products_config.NEWEST_PRODUCTS_CACHE_TTL,
+        fetch=lambda: service.newest_products(session=session),
+        response_model=list[schemas.NewestProducts]
+    )
+
+@router.get(
+    "/related/{product_serial}/",
+    dependencies=[cache_policy()],
+    status_code=status.HTTP_200_OK,
+    response_model=list[schemas.BaseProduct]
+)
+async def related_products(
+    product_serial: SerialNumber,
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
 ):
-    return await service.newest_products(
+    return await related_service.related_products(
         session=session,
-        redis=redis
+        serial_number=product_serial
     )
 
 # ==================== Guaranty routes ==================== #
@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field, field_validator
 from decimal import Decimal
 
 from src.schemas import CustomBaseModel
+from src.pagination import CursorPaginatedResponse, PaginatedResponse
 from src.products.types import CommentId, SerialNumber
 from src.admin.types import GuarantySerial
 from src.admin.schemas import ProductList, ProductDetail
@@ -11,19 +12,44 @@ from src.s3.config import storage_config
 
 
 class CommentIn(BaseModel):
-    message: str
+    message: Annotated[str, Field(min_length=1, max_length=2000)]
+
+    @field_validator("message", mode="after")
+    @classmethod
+    def reject_nul(cls, message: str) -> str:
+        # Postgres text can't store NUL characters.
+        if "\x00" in message:
+            raise ValueError("Message must not contain NUL characters.")
+        return message
 
 
-class CommentList(CommentIn):
-    id: CommentId
+class CommentList(BaseModel):
+    message: str
+    id: CommentId | None
     username: str
     created_at: Annotated[datetime, Field(serialization_alias="createdAt")]
+    pending: bool = False
+
+
+class CommentPage(CursorPaginatedResponse[CommentList]):
+    pass
 
 
 class UsersProductList(ProductList):
     price_after_discount: Annotated[Decimal | None, Field(alias="priceAfterDiscount")] = None
 
 
+class FacetCount(BaseModel):
+    facet: str
+    name: str
+    value: str
+    count: int
+
+
+class UsersProductListPage(PaginatedResponse[UsersProductList]):
+    facets: list[FacetCount] = []
+
+
 class UsersProductDetail(ProductDetail):
     price_after_discount: Annotated[Decimal | None, Field(alias="priceAfterDiscount")] = None
 
@@ -1,12 +1,19 @@
 import logging
-import json
+import asyncio
+import orjson
 import sqlalchemy as sa
 
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from uuid import UUID, uuid4
+from typing import Any
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
 from redis.asyncio import Redis
+from redis.exceptions import ResponseError
 
-from src.pagination import paginate
+from src.pagination import keyset_paginate, next_cursor, paginate
+from src.http_cache import ARTICLES, CATALOG, bump_cache_version
 from src.products import exceptions
 from src.products import schemas
 from src.products.models import (
@@ -17,13 +24,18 @@ from src.products.models import (
     ProductImage,
     AttributeValue,
     CategoryAttribute,
-    Attribute
+    Attribute,
+    FacetCount
 )
 from src.products.types import (
     ProductId,
+    CategoryId,
     CommentId,
+    CommentKind,
     SerialNumber,
+    FacetCountResponse,
     CommentListResponse,
+    CommentPageResponse,
     UserProductDetailResponse
 )
 from src.products.config import products_config
@@ -33,22 +45,44 @@ from src.admin.models import Guaranty
 from src.admin.schemas import ProductQuerySearch
 from src.admin.types import GuarantySerial
 from src.admin.exceptions import ProductNotFound
+from src.articles.models import Article, ArticleComment
 
 logger = logging.getLogger("products")
 
+FACETS_DIRTY_KEY = "facets:dirty-categories"
+
+
+def image_variant_url(variant: str) -> sa.Case:
+    """
+    Key of the resized variant once the consumer generated
+    it, same as admin.utils.image_variant_key, else the original.
+    """
+    return sa.case(
+        (
+            ProductImage.variants_ready.is_(True),
+            sa.func.regexp_replace(ProductImage.url, r"\.[^.]*$", "") + f"_{variant}.webp"
+        ),
+        else_=ProductImage.url
+    )
+
+
 product_image_subquery = sa.select(
-    ProductImage.url,
+    image_variant_url("card").label("url"),
     ProductImage.product_id
 ).distinct(ProductImage.product_id).subquery()
 
+# effective_price is materialized, so a discounted price
+# is just a comparison instead of a per-row CASE on current_date.
+price_after_discount = sa.case(
+    (Product.effective_price < Product.price, Product.effective_price),
+    else_=None
+)
+
 # ==================== Brand services ==================== #
 
 async def active_brands(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ) -> list:
-    if cached_data := await redis.get("brand-list"):
-        return json.loads(cached_data)
     query = sa.select(
         Brand.name, Brand.slug, Brand.description, Brand.is_active
     ).where(Brand.is_active.is_(True))
@@ -57,19 +91,13 @@ async def active_brands(
             result = (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
-    result_list = [
+    return [
         {
             "name": brand.name,
             "slug": brand.slug,
             "description": brand.description,
         } for brand in result
     ]
-    await redis.set(
-        name="brand-list",
-        value=json.dumps(result_list),
-        ex=products_config.BRANDS_CACHE_TTL
-    )
-    return result_list
 
 
 async def search_brand_by_name(
@@ -100,11 +128,8 @@ async def search_category_by_name(
 
 
 async def root_categories(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ) -> list:
-    if cached_data := await redis.get("root-categories"):
-        return json.loads(cached_data)
     query = sa.select(Category.id, Category.name).where(
         sa.and_(
             Category.parent_id.is_(None),
@@ -116,27 +141,18 @@ async def root_categories(
             result = (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
-    result_list = [
+    return [
         {
             "id": category.id,
             "name": category.name
         } for category in result
     ]
-    await redis.set(
-        name="root-categories",
-        value=json.dumps(result_list),
-        ex=products_config.ROOT_CATEGORIES_CACHE_TTL
-    )
-    return result_list
 
 
 async def sub_categories(
         session: async_sessionmaker[AsyncSession],
-        redis: Redis,
         parent_id: int
 ) -> list:
-    if cached_data := await redis.get(f"sub-categories:{parent_id}"):
-        return json.loads(cached_data)
     query = sa.select(Category.id, Category.name).where(
         sa.and_(
             Category.parent_id==parent_id,
@@ -148,19 +164,12 @@ async def sub_categories(
             result = (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
-    result_list = [
+    return [
         {
             "id": category.id,
             "name": category.name
         } for category in result
     ]
-    if result:
-        await redis.set(
-            name=f"sub-categories:{parent_id}",
-            value=json.dumps(result_list),
-            ex=products_config.SUB_CATEGORIES_CACHE_TTL
-        )
-    return result_list
 
 async def list_assigned_attributes(
         category_name: str,
@@ -195,43 +204,85 @@ async def create_comment(
             Comment.user_id: user_id
         }
     )
+    count_query = (
+        sa.update(Product)
+        .where(Product.id==product_id)
+        .values({Product.comment_count: Product.comment_count + 1})
+    )
     try:
         async with session.begin() as conn:
             await conn.execute(query)
+            await conn.execute(count_query)
     except IntegrityError as ex:
         logger.warning(ex)
         raise exceptions.CommentNotCreated
 
 
+async def decrement_comment_count(
+        conn: AsyncConnection,
+        product_id: ProductId | None
+) -> None:
+    """
+    Called with the product_id returned by a comment delete,
+    inside the transaction of the delete.
+    """
+    if product_id is None:
+        return
+    await conn.execute(
+        sa.update(Product)
+        .where(Product.id==product_id)
+        .values({Product.comment_count: Product.comment_count - 1})
+    )
+
+
 async def list_comments(
         session: async_sessionmaker[AsyncSession],
-        product_id: ProductId
-) -> list[CommentListResponse]:
-    query = (
-        sa.select(
-            Comment.id,
-            Comment.message,
-            Comment.created_at,
-            User.username
-        )
-        .select_from(Comment)
-        .join(User, Comment.user_id==User.id)
-        .where(Comment.product_id==product_id)
-        .order_by(Comment.created_at.desc())
+        product_id: ProductId,
+        limit: int,
+        after: tuple[datetime, int] | None = None
+) -> CommentPageResponse:
+    """
+    A page of the product's comments, newest first. The total is
+    Product.comment_count, so no page runs count(*).
+    """
+    count_query = sa.select(Product.comment_count).where(Product.id==product_id)
+    query = keyset_paginate(
+        query=(
+            sa.select(
+                Comment.id,
+                Comment.message,
+                Comment.created_at,
+                User.username
+            )
+            .select_from(Comment)
+            .join(User, Comment.user_id==User.id)
+            .where(Comment.product_id==product_id)
+        ),
+        created_at=Comment.created_at,
+        row_id=Comment.id,
+        limit=limit,
+        after=after
     )
+    count, result = 0, []
     try:
         async with session.begin() as conn:
-            result = (await conn.execute(query)).all()
+            count = await conn.scalar(count_query) or 0
+            result = list((await conn.execute(query)).all())
     except Exception as ex:
         logger.warning(ex)
-    return [
-        {
-            "id": comment.id,
-            "username": comment.username,
-            "message": comment.message,
-            "created_at": comment.created_at
-        } for comment in result
-    ]
+    return {
+        "count": count,
+        "items": [
+            {
+                "id": comment.id,
+                "username": comment.username,
+                "message": comment.message,
+                "created_at": comment.created_at,
+                "pending": False
+            } for comment in result[:limit]
+        ],
+        "next_cursor": next_cursor(rows=result, limit=limit)
+    }
 
 
 async def delete_my_comment(
@@ -244,18 +295,294 @@ async def delete_my_comment(
             Comment.id==comment_id,
             Comment.user_id==user_id
         )
-    ).returning(Comment.id)
+    ).returning(Comment.product_id)
     try:
         async with session.begin() as conn:
-            result: CommentId | None = await conn.scalar(query)
+            result: ProductId | None = await conn.scalar(query)
             if result is None:
                 raise exceptions.CommentNotOwner
+            await decrement_comment_count(conn=conn, product_id=result)
     except exceptions.CommentNotOwner as ex:
         logger.warning(ex)
         raise exceptions.CommentNotOwner
     except IntegrityError as ex:
         logger.warning(ex)
 
+# ==================== Comment buffer services ==================== #
+
+COMMENT_STREAM_KEY = "comments:stream"
+COMMENT_STREAM_GROUP = "comment-writers"
+COMMENT_STREAM_CONSUMER = "consumer"
+
+
+def pending_comments_key(kind: CommentKind, target_id: UUID, user_id: UserId) -> str:
+    return f"comments:pending:{kind}:{target_id}:{user_id}"
+
+
+def comment_tables(kind: CommentKind) -> tuple[Any, str, Any]:
+    """
+    Comment model, its target column and the model counting them.
+    """
+    if kind == "product":
+        return Comment, "product_id", Product
+    return ArticleComment, "article_id", Article
+
+
+def comment_target_key(kind: CommentKind, target_id: UUID) -> str:
+    return f"comments:target:{kind}:{target_id}"
+
+
+async def comment_target_exists(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        kind: CommentKind,
+        target_id: UUID
+) -> bool:
+    """
+    Whether the commented product or article exists, found
+    ones are cached so a burst of comments queries it once.
+    """
+    key = comment_target_key(kind=kind, target_id=target_id)
+    if await redis.exists(key):
+        return True
+    _model, _target_column, counted_model = comment_tables(kind)
+    query = sa.select(sa.exists().where(counted_model.id==target_id))
+    async with session.begin() as conn:
+        exists: bool = await conn.scalar(query) # type: ignore
+    if exists:
+        await redis.set(name=key, value=1, ex=products_config.COMMENT_TARGET_CACHE_TTL_SEC)
+    return exists
+
+
+async def buffer_comment(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        kind: CommentKind,
+        target_id: UUID,
+        user_id: UserId,
+        username: str,
+        message: str
+) -> None:
+    """
+    Appending the comment to the stream the consumer writes in
+    batches, and to the poster's pending comments so their own
+    listing shows it before it is written.
+    """
+    if not await comment_target_exists(session=session, redis=redis, kind=kind, target_id=target_id):
+        raise exceptions.CommentNotCreated
+    pending_id = uuid4().hex
+    created_at = datetime.now(timezone.utc).isoformat()
+    key = pending_comments_key(kind=kind, target_id=target_id, user_id=user_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.xadd(
+            COMMENT_STREAM_KEY,
+            {
+                "kind": kind,
+                "target_id": str(target_id),
+                "user_id": user_id,
+                "message": message,
+                "created_at": created_at,
+                "pending_id": pending_id
+            }
+        )
+        pipe.hset(
+            key,
+            pending_id,
+            orjson.dumps({"username": username, "message": message, "created_at": created_at})
+        )
+        pipe.expire(key, products_config.COMMENT_PENDING_TTL_SEC)
+        await pipe.execute()
+
+
+async def pending_comments(
+        redis: Redis,
+        kind: CommentKind,
+        target_id: UUID,
+        user_id: UserId
+) -> list[CommentListResponse]:
+    entries = await redis.hvals(
+        pending_comments_key(kind=kind, target_id=target_id, user_id=user_id)
+    )
+    comments: list[CommentListResponse] = []
+    for entry in entries:
+        comment = orjson.loads(entry)
+        comments.append(
+            {
+                "id": None,
+                "username": comment["username"],
+                "message": comment["message"],
+                "created_at": datetime.fromisoformat(comment["created_at"]),
+                "pending": True
+            }
+        )
+    return sorted(comments, key=lambda comment: comment["created_at"], reverse=True)
+
+
+def merge_pending_comments(
+        page: CommentPageResponse,
+        pending: list[CommentListResponse]
+) -> CommentPageResponse:
+    """
+    Putting the poster's pending comments, the newest ones,
+    on top of the first page.
+    """
+    if not pending:
+        return page
+    return {
+        "count": page["count"] + len(pending),
+        "items": pending + page["items"],
+        "next_cursor": page["next_cursor"]
+    }
+
+# ==================== Consumer side ==================== #
+
+async def create_comment_stream_group(redis: Redis) -> None:
+    try:
+        await redis.xgroup_create(
+            COMMENT_STREAM_KEY, COMMENT_STREAM_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as ex:
+        if "BUSYGROUP" not in str(ex):
+            raise
+
+
+async def insert_comment_batch(
+        conn: AsyncConnection,
+        kind: CommentKind,
+        rows: list[dict[str, Any]]
+) -> None:
+    """
+    One multi row INSERT for the batch and one counter
+    UPDATE per commented product or article.
+    """
+    model, target_column, counted_model = comment_tables(kind)
+    await conn.execute(sa.insert(model).values(rows))
+    added = Counter(row[target_column] for row in rows)
+    await conn.execute(
+        sa.update(counted_model)
+        .where(counted_model.id==sa.bindparam("target_id"))
+        .values({counted_model.comment_count: counted_model.comment_count + sa.bindparam("added")}),
+        [{"target_id": target_id, "added": count} for target_id, count in added.items()]
+    )
+
+
+async def insert_buffered_rows(
+        session: async_sessionmaker[AsyncSession],
+        rows: dict[CommentKind, list[dict[str, Any]]]
+) -> bool:
+    try:
+        async with session.begin() as conn:
+            for kind, kind_rows in rows.items():
+                await insert_comment_batch(conn=conn, kind=kind, rows=kind_rows)
+        return True
+    except (IntegrityError, DataError) as ex:
+        logger.warning(ex)
+    except Exception as ex:
+        logger.warning(ex)
+        return False
+
+    # Some product, article or user was deleted since posting, or a row
+    # can't be stored, the rest of the batch is written row by row.
+    for kind, kind_rows in rows.items():
+        for row in kind_rows:
+            try:
+                async with session.begin() as conn:
+                    await insert_comment_batch(conn=conn, kind=kind, rows=[row])
+            except (IntegrityError, DataError) as ex:
+                logger.warning(ex)
+            except Exception as ex:
+                logger.warning(ex)
+                return False
+    return True
+
+
+async def write_buffered_comments(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        backlog: bool = False
+) -> int | None:
+    """
+    Writing the next batch of buffered comments in one transaction.
+    With backlog, entries read before but never acknowledged (e.g.
+    the consumer died or the db was down) are retried first. Entries
+    are acknowledged after the commit, so a crash in between writes
+    them twice rather than losing them.
+    Returns how many entries were read, None if writing failed.
+    """
+    response = await redis.xreadgroup(
+        COMMENT_STREAM_GROUP,
+        COMMENT_STREAM_CONSUMER,
+        {COMMENT_STREAM_KEY: "0" if backlog else ">"},
+        count=products_config.COMMENT_BUFFER_BATCH_SIZE,
+        block=None if backlog else products_config.COMMENT_BUFFER_BLOCK_MS
+    )
+    read = response[0][1] if response else []
+    if not read:
+        return 0
+    # Entries deleted from the stream come back from the backlog without fields.
+    entries = [(entry_id, fields) for entry_id, fields in read if fields]
+
+    rows: dict[CommentKind, list[dict[str, Any]]] = defaultdict(list)
+    for _entry_id, fields in entries:
+        _model, target_column, _counted_model = comment_tables(fields["kind"])
+        rows[fields["kind"]].append(
+            {
+                "message": fields["message"],
+                target_column: UUID(fields["target_id"]),
+                "user_id": int(fields["user_id"]),
+                "created_at": datetime.fromisoformat(fields["created_at"])
+            }
+        )
+    if rows and not await insert_buffered_rows(session=session, rows=rows):
+        return None
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.xack(COMMENT_STREAM_KEY, COMMENT_STREAM_GROUP, *[entry_id for entry_id, _fields in read])
+        pipe.xdel(COMMENT_STREAM_KEY, *[entry_id for entry_id, _fields in read])
+        for _entry_id, fields in entries:
+            pipe.hdel(
+                pending_comments_key(
+                    kind=fields["kind"],
+                    target_id=UUID(fields["target_id"]),
+                    user_id=UserId(int(fields["user_id"]))
+                ),
+                fields["pending_id"]
+            )
+        await pipe.execute()
+    return len(read)
+
+
+async def recount_comment_counts(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Setting comment_count of products and articles back to their
+    real number of comments. Comments deleted by a cascade, e.g.
+    with their user, never decrement the counter.
+    """
+    recounted: dict[CommentKind, int] = dict()
+    try:
+        async with session.begin() as conn:
+            for kind in ("product", "article"):
+                model, target_column, counted_model = comment_tables(kind)
+                real_count = (
+                    sa.select(sa.func.count())
+                    .where(getattr(model, target_column)==counted_model.id)
+                    .scalar_subquery()
+                )
+                recounted[kind] = (await conn.execute(
+                    sa.update(counted_model)
+                    .where(counted_model.comment_count!=real_count)
+                    .values({counted_model.comment_count: real_count})
+                )).rowcount
+    except Exception as ex:
+        logger.warning(ex)
+        return
+    scopes = [scope for kind, scope in (("product", CATALOG), ("article", ARTICLES)) if recounted[kind]]
+    if scopes:
+        await bump_cache_version(redis, *scopes)
+
 # ==================== Attribute services ==================== #
 
 async def search_attribute(
@@ -275,6 +602,56 @@ async def search_attribute(
 
 # ==================== Product services ==================== #
 
+def attribute_filter_query(attribute_filters: dict[str, str]) -> sa.Select:
+    """
+    Ids of products matching all attribute = value pairs in one lookup
+    on idx_attribute_value_product, instead of a self join per attribute.
+    """
+    return (
+        sa.select(AttributeValue.product_id)
+        .where(
+            sa.tuple_(AttributeValue.attribute_name, AttributeValue.value).in_(
+                list(attribute_filters.items())
+            )
+        )
+        .group_by(AttributeValue.product_id)
+        .having(sa.func.count(AttributeValue.attribute_name.distinct())==len(attribute_filters))
+    )
+
+
+def category_subtree_cte(category_name: str) -> sa.CTE:
+    """
+    Recursive cte of the given category and all of
+    its descendants, level is the depth from it.
+    """
+    categories_cte = sa.select(
+        Category.id,
+        Category.name,
+        Category.is_active,
+        Category.parent_id,
+        sa.literal(0).label("level")
+    ).where(
+        sa.and_(
+            Category.name==category_name,
+            Category.is_active.is_(True)
+        )
+    ).cte(recursive=True)
+
+    category_alias = sa.alias(Category) # type: ignore
+
+    recursive_query = sa.select(
+        category_alias.c.id,
+        category_alias.c.name,
+        category_alias.c.is_active,
+        category_alias.c.parent_id,
+        (categories_cte.c.level + 1).label("level")
+    ).join(
+        categories_cte, categories_cte.c.id==category_alias.c.parent_id
+    )
+
+    return categories_cte.union(recursive_query)
+
+
 async def list_products(
         engine: AsyncEngine,
         filter_query: ProductQuerySearch,
@@ -291,19 +668,7 @@ async def list_products(
             Product.price,
             Product.discount,
             Product.is_active,
-            sa.func.round(
-                sa.case(
-                (
-                    (
-                        Product.discount.is_not(None) &
-                        Product.expiry_discount.is_not(None) &
-                        (Product.expiry_discount >= sa.func.current_date())
-                    ),
-                    Product.price * (1 - Product.discount / 100)
-                ),
-                    else_=None
-                ), 6
-            ).label("price_after_discount"),
+            price_after_discount.label("price_after_discount"),
             Category.name.label("category_name"),
             Brand.name.label("brand_name"),
             product_image_subquery.c.url.label("image_url")
@@ -323,32 +688,7 @@ async def list_products(
         )
 
     if filter_query.category__exact:
-        categories_cte = sa.select(
-            Category.id,
-            Category.name,
-            Category.is_active,
-            Category.parent_id,
-            sa.literal(0).label("level")
-        ).where(
-            sa.and_(
-                Category.name==filter_query.category__exact,
-                Category.is_active.is_(True)
-            )
-        ).cte(recursive=True)
-
-        category_alias = sa.alias(Category) # type: ignore
-
-        recursive_query = sa.select(
-            category_alias.c.id,
-            category_alias.c.name,
-            category_alias.c.is_active,
-            category_alias.c.parent_id,
-            (categories_cte.c.level + 1).label("level")
-        ).join(
-            categories_cte, categories_cte.c.id==category_alias.c.parent_id
-        )
-
-        categories_cte = categories_cte.union(recursive_query)
+        categories_cte = category_subtree_cte(filter_query.category__exact)
         query = query.join(
             categories_cte, Product.category_id==categories_cte.c.id
         ).where(categories_cte.c.is_active.is_(True)).order_by(
@@ -360,19 +700,85 @@ async def list_products(
             Product.name.ilike(f"%{filter_query.name__contain}%")
         )
 
+    if filter_query.price__gte is not None:
+        query = query.where(Product.effective_price >= filter_query.price__gte)
+
+    if filter_query.price__lte is not None:
+        query = query.where(Product.effective_price <= filter_query.price__lte)
+
+    if filter_query.in_stock:
+        query = query.where(Product.stock > 0)
+
+    if filter_query.attribute_filters:
+        query = query.where(
+            Product.id.in_(attribute_filter_query(filter_query.attribute_filters))
+        )
+
     query = query.where(
         Product.is_active.is_(True),
         Brand.is_active.is_(True),
         Category.is_active.is_(True)
-    ).order_by(Product.created_at.desc())
+    )
+    if filter_query.order_by == "price":
+        query = query.order_by(Product.effective_price.asc(), Product.id)
+    elif filter_query.order_by == "-price":
+        query = query.order_by(Product.effective_price.desc(), Product.id)
+    else:
+        query = query.order_by(Product.created_at.desc())
 
-    return await paginate(
-        engine=engine, query=query, limit=limit, offset=offset
+    result, facets = await asyncio.gather(
+        paginate(engine=engine, query=query, limit=limit, offset=offset),
+        facet_counts_within_budget(engine=engine, category_name=filter_query.category__exact)
     )
+    if result is not None:
+        result["facets"] = facets
+    return result
+
+
+async def expire_discounts(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Dropping discounts whose expiry_discount has passed
+    and resetting effective_price back to price.
+    """
+    query = sa.update(Product).where(
+        Product.expiry_discount < sa.func.current_date()
+    ).values(
+        {
+            Product.discount: None,
+            Product.expiry_discount: None,
+            Product.effective_price: Product.price
+        }
+    )
+    try:
+        async with session.begin() as conn:
+            expired = (await conn.execute(query)).rowcount
+    except Exception as ex:
+        logger.warning(ex)
+        return
+    if expired:
+        await bump_cache_version(redis, CATALOG)
+
+
+async def available_stock(
+        redis: Redis,
+        product_id: ProductId
+) -> int | None:
+    """
+    Stock mirrored in redis minus the units held by
+    checkout reservations, None when it isn't mirrored yet.
+    """
+    stock, reserved = await redis.mget(f"stock:{product_id}", f"reserved:{product_id}")
+    if stock is None:
+        return None
+    return max(int(stock) - int(reserved or 0), 0)
 
 
 async def product_detail(
         session: async_sessionmaker[AsyncSession],
+        redis: Redis,
         product_serial: SerialNumber,
 ) -> UserProductDetailResponse:
     query = (
@@ -386,24 +792,12 @@ async def product_detail(
             Product.is_active,
             Product.description,
             Product.expiry_discount,
-            sa.func.round(
-                sa.case(
-                (
-                    (
-                        Product.discount.is_not(None) &
-                        Product.expiry_discount.is_not(None) &
-                        (Product.expiry_discount >= sa.func.current_date())
-                    ),
-                    Product.price * (1 - Product.discount / 100)
-                ),
-                    else_=None
-                ), 6
-            ).label("price_after_discount"),
+            price_after_discount.label("price_after_discount"),
             Category.name.label("category_name"),
             Brand.name.label("brand_name"),
             AttributeValue.attribute_name.label("attribute"),
             AttributeValue.value,
-            ProductImage.url.label("image_urls")
+            image_variant_url("full").label("image_urls")
         )
         .select_from(Product)
         .join(Category, Product.category_id==Category.id)
@@ -437,12 +831,13 @@ async def product_detail(
     for p in result:
         if p.attribute not in attribute_values:
             attribute_values[p.attribute] = p.value
+    stock = await available_stock(redis=redis, product_id=result[0].id)
     return {
         "id": result[0].id,
         "serial_number": result[0].serial_number,
         "is_active": result[0].is_active,
         "name": result[0].name,
-        "stock": result[0].stock,
+        "stock": stock if stock is not None else result[0].stock,
         "price": result[0].price,
         "discount": result[0].discount,
         "description": result[0].description,
@@ -456,11 +851,8 @@ async def product_detail(
 
 
 async def most_viewed_products(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ):
-    if cached_data := await redis.get("most-viewed-products"):
-        return json.loads(cached_data)
     query = (
         sa.select(
             Product.name,
@@ -474,32 +866,14 @@ async def most_viewed_products(
     )
     try:
         async with session.begin() as conn:
-            result = (await conn.execute(query)).all()
-            result_list = [
-                {
-                    "name": product.name,
-                    "serial_number": product.serial_number,
-                    "views": product.views,
-                    "image": product.image
-                } for product in result
-            ]
-            await redis.set(
-                name="most-viewed-products",
-                value=json.dumps(result_list),
-                ex=180
-            )
-            return result
-        
+            return (await conn.execute(query)).all()
     except Exception as ex:
         logger.warning(ex)
 
 
 async def newest_products(
-        session: async_sessionmaker[AsyncSession],
-        redis: Redis
+        session: async_sessionmaker[AsyncSession]
 ):
-    if cached_data := await redis.get("newest-products"):
-        return json.loads(cached_data)
     query = (
         sa.select(
             Product.name,
@@ -513,24 +887,168 @@ async def newest_products(
     )
     try:
         async with session.begin() as conn:
-            result = (await conn.execute(query)).all()
-            result_list = [
-                {
-                    "name": product.name,
-                    "serial_number": product.serial_number,
-                    "created_at": str(product.created_at),
-                    "image": product.image
-                } for product in result
-            ]
-            await redis.set(
-                name="newest-products",
-                value=json.dumps(result_list),
-                ex=1020
+            return (await conn.execute(query)).all()
+    except Exception as ex:
+        logger.warning(ex)
+
+# ==================== Facet services ==================== #
+
+def price_bucket() -> sa.Case:
+    """
+    Labels effective_price with the PRICE_FACET_BOUNDARIES
+    range it falls in, e.g. "10000000-50000000" or "500000000-".
+    """
+    boundaries = products_config.PRICE_FACET_BOUNDARIES
+    return sa.case(
+        *[
+            (Product.effective_price < upper, f"{lower}-{upper}")
+            for lower, upper in zip(boundaries, boundaries[1:])
+        ],
+        else_=f"{boundaries[-1]}-"
+    )
+
+
+async def mark_facets_dirty(
+        redis: Redis,
+        *category_ids: CategoryId | None
+) -> None:
+    if ids := [category_id for category_id in category_ids if category_id is not None]:
+        await redis.sadd(FACETS_DIRTY_KEY, *ids)
+
+
+async def refresh_facet_counts(
+        session: async_sessionmaker[AsyncSession],
+        category_ids: list[CategoryId] | None = None
+) -> bool:
+    """
+    Recomputing facetcounts of the given categories,
+    all of them when category_ids is not provided.
+    """
+    def facet_query(facet: str, name, value) -> sa.Select:
+        query = (
+            sa.select(
+                Product.category_id,
+                sa.literal(facet).label("facet"),
+                name.label("name"),
+                value.label("value"),
+                sa.func.count().label("count")
             )
-            return result
+            .select_from(Product)
+            .join(Brand, Product.brand_id==Brand.id)
+            .where(
+                Product.is_active.is_(True),
+                Brand.is_active.is_(True),
+                Product.category_id.is_not(None)
+            )
+            .group_by(sa.text("1, 2, 3, 4"))
+        )
+        if category_ids is not None:
+            query = query.where(Product.category_id.in_(category_ids))
+        return query
+
+    facets_query = sa.union_all(
+        facet_query("brand", sa.literal(""), Brand.name),
+        facet_query("price", sa.literal(""), price_bucket()),
+        facet_query(
+            "stock",
+            sa.literal(""),
+            sa.case((Product.stock > 0, "in_stock"), else_="out_of_stock")
+        ),
+        facet_query(
+            "attribute", AttributeValue.attribute_name, AttributeValue.value
+        ).join(AttributeValue, Product.id==AttributeValue.product_id).where(
+            AttributeValue.value.is_not(None)
+        )
+    )
+    delete_query = sa.delete(FacetCount)
+    if category_ids is not None:
+        delete_query = delete_query.where(FacetCount.category_id.in_(category_ids))
+    insert_query = sa.insert(FacetCount).from_select(
+        ["category_id", "facet", "name", "value", "count"], facets_query
+    )
+    try:
+        async with session.begin() as conn:
+            await conn.execute(delete_query)
+            await conn.execute(insert_query)
+    except Exception as ex:
+        logger.warning(ex)
+        return False
+    return True
+
 
+async def refresh_dirty_facets(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Recomputing only categories whose products changed since the last run.
+    """
+    refreshed = False
+    while category_ids := await redis.spop(FACETS_DIRTY_KEY, count=500):
+        if not await refresh_facet_counts(
+            session=session,
+            category_ids=[CategoryId(int(category_id)) for category_id in category_ids]
+        ):
+            await redis.sadd(FACETS_DIRTY_KEY, *category_ids)
+            break
+        refreshed = True
+    if refreshed:
+        await bump_cache_version(redis, CATALOG)
+
+
+async def facet_counts(
+        engine: AsyncEngine,
+        category_name: str | None
+) -> list[FacetCountResponse]:
+    """
+    Summing the precomputed counts over the category subtree, the
+    counts describe the category and don't narrow with other filters.
+    """
+    total = sa.func.sum(FacetCount.count)
+    query = (
+        sa.select(FacetCount.facet, FacetCount.name, FacetCount.value, total.label("count"))
+        .group_by(FacetCount.facet, FacetCount.name, FacetCount.value)
+        .order_by(FacetCount.facet, FacetCount.name, total.desc())
+    )
+    if category_name:
+        categories_cte = category_subtree_cte(category_name)
+        query = query.join(
+            categories_cte, FacetCount.category_id==categories_cte.c.id
+        ).where(categories_cte.c.is_active.is_(True))
+    else:
+        query = query.join(
+            Category, FacetCount.category_id==Category.id
+        ).where(Category.is_active.is_(True))
+    async with engine.begin() as conn:
+        result = (await conn.execute(query)).all()
+    return [
+        {
+            "facet": facet.facet,
+            "name": facet.name,
+            "value": facet.value,
+            "count": facet.count
+        } for facet in result
+    ]
+
+
+async def facet_counts_within_budget(
+        engine: AsyncEngine,
+        category_name: str | None
+) -> list[FacetCountResponse]:
+    """
+    Product page must not wait on facets, they are
+    dropped when FACET_LATENCY_BUDGET_MS is exceeded.
+    """
+    try:
+        return await asyncio.wait_for(
+            facet_counts(engine=engine, category_name=category_name),
+            timeout=products_config.FACET_LATENCY_BUDGET_MS / 1000
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Facet counts exceeded the latency budget.")
     except Exception as ex:
         logger.warning(ex)
+    return []
 
 # ==================== Guaranty service ==================== #
 
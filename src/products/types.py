@@ -1,4 +1,4 @@
-from typing import NewType, TypedDict
+from typing import Literal, NewType, TypedDict
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
@@ -12,14 +12,31 @@ ProductImageId = NewType("ProductImageId", int)
 CategoryId = NewType("CategoryId", int)
 AttributeValueId = NewType("AttributeValueId", int)
 CommentId = NewType("CommentId", int)
+CommentKind = Literal["product", "article"]
 
 # ==================== Query result types ==================== #
 
+
 class CommentListResponse(TypedDict):
-    id: CommentId
+    # None for the poster's own comments still in the buffer.
+    id: CommentId | None
     username: str
     message: str
     created_at: datetime
+    pending: bool
+
+
+class CommentPageResponse(TypedDict):
+    count: int
+    items: list[CommentListResponse]
+    next_cursor: str | None
+
+
+class FacetCountResponse(TypedDict):
+    facet: str
+    name: str
+    value: str
+    count: int
 
 
 class UserProductDetailResponse(TypedDict):
@@ -0,0 +1,18 @@
+from pydantic_settings import BaseSettings
+
+
+class RelatedConfig(BaseSettings):
+    RELATED_TOP_K: int = 10
+    # Items created since the last run get their lists every interval,
+    # everything is recomputed on the full refresh.
+    RELATED_REFRESH_INTERVAL_SEC: int = 300
+    RELATED_FULL_REFRESH_INTERVAL_SEC: int = 24 * 60 * 60
+    RELATED_INSERT_CHUNK_SIZE: int = 1000
+    # Added to the shared attributes jaccard of two products.
+    RELATED_BRAND_WEIGHT: float = 0.3
+    RELATED_CATEGORY_WEIGHT: float = 0.2
+    # Products of the same category, brand or both which are scored
+    # besides those sharing attributes, they only differ by attributes.
+    RELATED_MEMBER_SAMPLE_SIZE: int = 50
+
+related_config = RelatedConfig() # type: ignore
@@ -0,0 +1,29 @@
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from uuid import UUID
+
+from src.database import Base
+
+
+class RelatedItem(Base):
+    """
+    Top RELATED_TOP_K related articles or products of an item, written
+    by the consumer with what list pages show so reads need no joins.
+    """
+    __tablename__ = "related_items"
+    __table_args__ = (
+        sa.PrimaryKeyConstraint("kind", "item_id", "rank"),
+    )
+
+    kind: so.Mapped[str] = so.mapped_column(sa.String(20))
+    item_id: so.Mapped[UUID]
+    rank: so.Mapped[int]
+    related_id: so.Mapped[UUID] = so.mapped_column(index=True)
+    score: so.Mapped[float]
+    title: so.Mapped[str] = so.mapped_column(sa.String(200))
+    image: so.Mapped[str] = so.mapped_column(sa.String(250))
+    serial_number: so.Mapped[str | None] = so.mapped_column(sa.String(150))
+
+    def __repr__(self) -> str:
+        return f"{self.kind} {self.item_id} #{self.rank}: {self.related_id}"
@@ -0,0 +1,351 @@
+import heapq
+import asyncio
+import logging
+import sqlalchemy as sa
+
+from uuid import UUID
+from datetime import datetime
+from collections import Counter, defaultdict
+from concurrent.futures import Executor
+from typing import Any, Hashable
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from src.related.config import related_config
+from src.related.models import RelatedItem
+from src.related.types import RelatedKind
+from src.articles.models import Article, ArticleTag
+from src.articles.service import image_cte
+from src.articles.types import ArticleId
+from src.products.models import AttributeValue, Category, Product
+from src.products.service import product_image_subquery
+from src.products.types import SerialNumber
+
+logger = logging.getLogger("related")
+
+
+def jaccard_scores(
+        item_id: UUID,
+        item_sets: dict[UUID, frozenset[Hashable]],
+        postings: dict[Hashable, list[UUID]]
+) -> dict[UUID, float]:
+    """
+    Jaccard index of item_id against every item sharing a member with it.
+    Shared counts come from counting the postings of its members,
+    so items sharing nothing are never looked at.
+    """
+    members = item_sets[item_id]
+    shared: Counter[UUID] = Counter()
+    for member in members:
+        shared.update(postings[member])
+    del shared[item_id]
+    return {
+        other: count / (len(members) + len(item_sets[other]) - count)
+        for other, count in shared.items()
+    }
+
+
+def build_postings(
+        pairs: list[tuple[UUID, Hashable]]
+) -> tuple[dict[UUID, frozenset[Hashable]], dict[Hashable, list[UUID]]]:
+    item_sets: dict[UUID, set[Hashable]] = defaultdict(set)
+    for item_id, member in pairs:
+        item_sets[item_id].add(member)
+    postings: dict[Hashable, list[UUID]] = defaultdict(list)
+    for item_id, members in item_sets.items():
+        for member in members:
+            postings[member].append(item_id)
+    return {item_id: frozenset(members) for item_id, members in item_sets.items()}, postings
+
+
+async def write_related_items(
+        session: async_sessionmaker[AsyncSession],
+        kind: RelatedKind,
+        item_ids: list[UUID] | None,
+        rows: list[dict[str, Any]]
+) -> bool:
+    """
+    Replacing the lists of item_ids, or of every item of
+    the kind when item_ids is None, in one transaction.
+    """
+    delete_query = sa.delete(RelatedItem).where(RelatedItem.kind==kind)
+    if item_ids is not None:
+        delete_query = delete_query.where(
+            RelatedItem.item_id==sa.any_(sa.bindparam("ids", item_ids, type_=ARRAY(sa.UUID)))
+        )
+    chunk_size = related_config.RELATED_INSERT_CHUNK_SIZE
+    try:
+        async with session.begin() as conn:
+            await conn.execute(delete_query)
+            for offset in range(0, len(rows), chunk_size):
+                await conn.execute(sa.insert(RelatedItem), rows[offset:offset + chunk_size])
+    except Exception as ex:
+        logger.warning(ex)
+        return False
+    return True
+
+
+async def delete_related_items(
+        conn: AsyncConnection,
+        kind: RelatedKind,
+        item_id: UUID
+) -> None:
+    """
+    Dropping a deleted item's list and its appearances in other
+    lists, inside the transaction which deletes the item.
+    """
+    await conn.execute(
+        sa.delete(RelatedItem).where(
+            sa.or_(
+                sa.and_(RelatedItem.kind==kind, RelatedItem.item_id==item_id),
+                RelatedItem.related_id==item_id
+            )
+        )
+    )
+
+# ==================== Consumer side ==================== #
+
+async def refresh_related_articles(
+        session: async_sessionmaker[AsyncSession],
+        since: datetime | None = None
+) -> bool:
+    """
+    Ranking articles by the jaccard index of their tags. Only articles
+    created after since get new lists, all of them when it is None.
+    """
+    tags_query = sa.select(ArticleTag.article_id, ArticleTag.tag_name)
+    articles_query = (
+        sa.select(Article.id, Article.title, Article.created_at, image_cte.c.image)
+        .join(image_cte, Article.id==image_cte.c.image_article_id, isouter=True)
+    )
+    try:
+        async with session.begin() as conn:
+            tag_pairs = (await conn.execute(tags_query)).tuples().all()
+            articles = {article.id: article for article in (await conn.execute(articles_query)).all()}
+    except Exception as ex:
+        logger.warning(ex)
+        return False
+
+    item_sets, postings = build_postings(list(tag_pairs))
+    targets = [
+        article_id for article_id, article in articles.items()
+        if since is None or article.created_at >= since
+    ]
+    rows: list[dict[str, Any]] = []
+    for article_id in targets:
+        if article_id not in item_sets:
+            continue
+        scores = jaccard_scores(article_id, item_sets, postings)
+        best = heapq.nlargest(
+            related_config.RELATED_TOP_K,
+            (
+                (score, other) for other, score in scores.items()
+                if other in articles and articles[other].image is not None
+            )
+        )
+        rows.extend(
+            {
+                "kind": "article",
+                "item_id": article_id,
+                "rank": rank,
+                "related_id": other,
+                "score": score,
+                "title": articles[other].title,
+                "image": articles[other].image,
+                "serial_number": None
+            } for rank, (score, other) in enumerate(best, start=1)
+        )
+    if since is not None and not targets:
+        return True
+    return await write_related_items(
+        session=session,
+        kind="article",
+        item_ids=None if since is None else targets,
+        rows=rows
+    )
+
+
+def rank_related_products(
+        products: dict[UUID, dict[str, Any]],
+        attribute_pairs: list[tuple[UUID, Hashable]],
+        targets: list[UUID]
+) -> list[dict[str, Any]]:
+    """
+    Related rows of the target products. Candidates are the products
+    sharing an attribute value plus at most RELATED_MEMBER_SAMPLE_SIZE
+    products of the same category, brand and both, which score the same
+    unless they share attributes. CPU bound, so the consumer runs it
+    in its process pool.
+    """
+    item_sets, postings = build_postings(attribute_pairs)
+    sample_size = related_config.RELATED_MEMBER_SAMPLE_SIZE
+    category_members: dict[int, list[UUID]] = defaultdict(list)
+    brand_members: dict[tuple[int | None, int], list[UUID]] = defaultdict(list)
+    category_brand_members: dict[tuple[int, int], list[UUID]] = defaultdict(list)
+    for product in products.values():
+        if product["image"] is None:
+            continue
+        if product["category_id"] is not None and len(category_members[product["category_id"]]) < sample_size:
+            category_members[product["category_id"]].append(product["id"])
+        if product["brand_id"] is not None:
+            brand_key = (product["subtree_id"], product["brand_id"])
+            if len(brand_members[brand_key]) < sample_size:
+                brand_members[brand_key].append(product["id"])
+            if product["category_id"] is not None:
+                category_brand_key = (product["category_id"], product["brand_id"])
+                if len(category_brand_members[category_brand_key]) < sample_size:
+                    category_brand_members[category_brand_key].append(product["id"])
+
+    rows: list[dict[str, Any]] = []
+    for product_id in targets:
+        product = products[product_id]
+        attribute_scores = (
+            jaccard_scores(product_id, item_sets, postings) if product_id in item_sets else {}
+        )
+        candidates = set(attribute_scores)
+        if product["category_id"] is not None:
+            candidates.update(category_members[product["category_id"]])
+        if product["brand_id"] is not None:
+            candidates.update(brand_members[(product["subtree_id"], product["brand_id"])])
+            if product["category_id"] is not None:
+                candidates.update(category_brand_members[(product["category_id"], product["brand_id"])])
+        candidates.discard(product_id)
+
+        scored = []
+        for other_id in candidates:
+            other = products[other_id]
+            if other["image"] is None or other["subtree_id"] != product["subtree_id"]:
+                continue
+            score = attribute_scores.get(other_id, 0.0)
+            if product["brand_id"] is not None and other["brand_id"] == product["brand_id"]:
+                score += related_config.RELATED_BRAND_WEIGHT
+            if product["category_id"] is not None and other["category_id"] == product["category_id"]:
+                score += related_config.RELATED_CATEGORY_WEIGHT
+            scored.append((score, other_id))
+        best = heapq.nlargest(related_config.RELATED_TOP_K, scored)
+        rows.extend(
+            {
+                "kind": "product",
+                "item_id": product_id,
+                "rank": rank,
+                "related_id": other_id,
+                "score": score,
+                "title": products[other_id]["name"],
+                "image": products[other_id]["image"],
+                "serial_number": products[other_id]["serial_number"]
+            } for rank, (score, other_id) in enumerate(best, start=1)
+        )
+    return rows
+
+
+async def refresh_related_products(
+        session: async_sessionmaker[AsyncSession],
+        pool: Executor,
+        since: datetime | None = None
+) -> bool:
+    """
+    Ranking active products of the same category subtree (children of
+    the same parent category) by the jaccard index of their attribute
+    values, plus weights for the same brand and the same category.
+    """
+    attributes_query = (
+        sa.select(AttributeValue.product_id, AttributeValue.attribute_name, AttributeValue.value)
+        .where(AttributeValue.value.is_not(None))
+    )
+    products_query = (
+        sa.select(
+            Product.id,
+            Product.name,
+            Product.serial_number,
+            Product.brand_id,
+            Product.category_id,
+            Product.created_at,
+            sa.func.coalesce(Category.parent_id, Product.category_id).label("subtree_id"),
+            product_image_subquery.c.url.label("image")
+        )
+        .join(Category, Product.category_id==Category.id, isouter=True)
+        .join(product_image_subquery, Product.id==product_image_subquery.c.product_id, isouter=True)
+        .where(Product.is_active.is_(True))
+    )
+    try:
+        async with session.begin() as conn:
+            attribute_rows = (await conn.execute(attributes_query)).all()
+            products = {
+                product.id: product._asdict() for product in (await conn.execute(products_query)).all()
+            }
+    except Exception as ex:
+        logger.warning(ex)
+        return False
+
+    targets = [
+        product_id for product_id, product in products.items()
+        if since is None or product["created_at"] >= since
+    ]
+    if since is not None and not targets:
+        return True
+    rows = await asyncio.get_running_loop().run_in_executor(
+        pool,
+        rank_related_products,
+        products,
+        [
+            (row.product_id, (row.attribute_name, row.value))
+            for row in attribute_rows if row.product_id in products
+        ],
+        targets
+    )
+    return await write_related_items(
+        session=session,
+        kind="product",
+        item_ids=None if since is None else targets,
+        rows=rows
+    )
+
+# ==================== Read side ==================== #
+
+async def related_articles(
+        session: async_sessionmaker[AsyncSession],
+        article_id: ArticleId
+) -> list:
+    query = (
+        sa.select(RelatedItem.related_id.label("id"), RelatedItem.title, RelatedItem.image)
+        .where(
+            sa.and_(
+                RelatedItem.kind=="article",
+                RelatedItem.item_id==article_id
+            )
+        )
+        .order_by(RelatedItem.rank)
+    )
+    try:
+        async with session.begin() as conn:
+            return list((await conn.execute(query)).all())
+    except Exception as ex:
+        logger.warning(ex)
+        return []
+
+
+async def related_products(
+        session: async_sessionmaker[AsyncSession],
+        serial_number: SerialNumber
+) -> list:
+    product_id = (
+        sa.select(Product.id)
+        .where(Product.serial_number==serial_number)
+        .scalar_subquery()
+    )
+    query = (
+        sa.select(RelatedItem.serial_number, RelatedItem.title.label("name"), RelatedItem.image)
+        .where(
+            sa.and_(
+                RelatedItem.kind=="product",
+                RelatedItem.item_id==product_id
+            )
+        )
+        .order_by(RelatedItem.rank)
+    )
+    try:
+        async with session.begin() as conn:
+            return list((await conn.execute(query)).all())
+    except Exception as ex:
+        logger.warning(ex)
+        return []
@@ -0,0 +1,5 @@
+from typing import Literal
+
+# ==================== Models types ==================== #
+
+RelatedKind = Literal["article", "product"]
@@ -0,0 +1,145 @@
+import hashlib
+import orjson
+
+from typing import Any, Awaitable, Callable
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache
+def type_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def serialize(data: Any, response_model: Any | None = None) -> bytes:
+    """
+    Producing the same body FastAPI would for response_model,
+    in one pass of pydantic's serializer instead of jsonable_encoder.
+    Payloads without a model are dumped with orjson.
+    """
+    if response_model is None:
+        return orjson.dumps(data)
+    adapter = type_adapter(response_model)
+    return adapter.dump_json(
+        adapter.validate_python(data, from_attributes=True), by_alias=True
+    )
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison as If-None-Match requires, W/ is ignored on both sides.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    )
+
+
+def is_not_modified(
+        request: Request,
+        etag: str,
+        last_modified: datetime
+) -> bool:
+    """
+    If-None-Match wins over If-Modified-Since as in RFC 9110.
+    """
+    if if_none_match := request.headers.get("if-none-match"):
+        return etag_matches(if_none_match, etag)
+    if if_modified_since := request.headers.get("if-modified-since"):
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def json_response(
+        request: Request,
+        body: bytes,
+        last_modified: datetime
+) -> Response:
+    etag = make_etag(body)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True)
+    }
+    if is_not_modified(request=request, etag=etag, last_modified=last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+async def cached_body(
+        redis: Redis,
+        key: str,
+        ttl: int
+) -> tuple[bytes, datetime] | None:
+    """
+    Cached body of key with when it was set, derived from its ttl.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(key)
+        pipe.ttl(key)
+        body, remaining_ttl = await pipe.execute()
+    if body is None:
+        return None
+    age = ttl - remaining_ttl if 0 <= remaining_ttl <= ttl else 0
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return body.encode(), now - timedelta(seconds=age)
+
+
+async def fill_cached_body(
+        redis: Redis,
+        key: str,
+        ttl: int,
+        fetch: Callable[[], Awaitable[Any]],
+        response_model: Any | None = None,
+        cache_empty: bool = True
+) -> bytes:
+    data = await fetch()
+    body = serialize(data=data, response_model=response_model)
+    if data or cache_empty:
+        await redis.set(name=key, value=body, ex=ttl)
+    return body
+
+
+async def cached_json_response(
+        request: Request,
+        redis: Redis,
+        key: str,
+        ttl: int,
+        fetch: Callable[[], Awaitable[Any]],
+        response_model: Any | None = None,
+        cache_empty: bool = True
+) -> Response:
+    """
+    Redis keeps the final response body, so a hit is written out
+    as is without json.loads, validation and re-serialization.
+    """
+    if cached := await cached_body(redis=redis, key=key, ttl=ttl):
+        body, last_modified = cached
+        return json_response(request=request, body=body, last_modified=last_modified)
+
+    body = await fill_cached_body(
+        redis=redis,
+        key=key,
+        ttl=ttl,
+        fetch=fetch,
+        response_model=response_model,
+        cache_empty=cache_empty
+    )
+    return json_response(
+        request=request,
+        body=body,
+        last_modified=datetime.now(timezone.utc).replace(microsecond=0)
+    )
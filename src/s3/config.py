@@ -7,5 +7,27 @@ class StorageConfig(BaseSettings):
     BUCKET_NAME: str
     STORAGE_ACCESS_KEY: str
     STORAGE_SECRET_KEY: str
+    PRESIGNED_URL_TTL_SEC: int = 600
+    # Files bigger than the threshold are uploaded in parts, s3 needs parts >= 5MB.
+    MULTIPART_THRESHOLD: int = 16 * 1024 * 1024
+    MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    MULTIPART_CONCURRENCY: int = 4
+    # Concurrent head_object calls when checking a batch of uploads.
+    METADATA_CONCURRENCY: int = 16
+    DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # Downloads bigger than this spill from memory into a temp file.
+    SPOOLED_FILE_MAX_SIZE: int = 8 * 1024 * 1024
+    # delete_objects accepts at most 1000 keys per call.
+    OUTBOX_BATCH_SIZE: int = 1000
+    OUTBOX_POLL_INTERVAL_SEC: int = 5
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_BACKOFF_SEC: int = 30
+    # Uploads happen after commit, rows are checked against the bucket after this.
+    UPLOAD_VERIFY_DELAY_SEC: int = 600
+    # Unreferenced objects younger than this are kept, it must stay longer
+    # than uploads can wait for their rows (UPLOAD_CONFIRM_TTL_SEC).
+    ORPHAN_GRACE_PERIOD_SEC: int = 24 * 60 * 60
+    ORPHAN_GC_INTERVAL_SEC: int = 24 * 60 * 60
+    ORPHAN_GC_DRY_RUN: bool = True
 
 storage_config = StorageConfig() # type: ignore
@@ -0,0 +1,28 @@
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from datetime import datetime
+
+from src.database import Base
+from src.s3.types import OutboxId
+
+
+class S3Outbox(Base):
+    """
+    S3 work written in the same transaction as the db change and
+    drained by the consumer. action is "delete" for objects whose rows
+    are gone, or "verify_product_image"/"verify_article_image" to drop
+    image rows whose upload never reached the bucket.
+    """
+    __tablename__ = "s3_outbox"
+
+    id: so.Mapped[OutboxId] = so.mapped_column(primary_key=True, autoincrement=True)
+    key: so.Mapped[str] = so.mapped_column(sa.String(250))
+    action: so.Mapped[str] = so.mapped_column(sa.String(50))
+    attempts: so.Mapped[int] = so.mapped_column(default=0, server_default="0", init=False)
+    available_at: so.Mapped[datetime] = so.mapped_column(
+        sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"{self.id} {self.action} {self.key}"
@@ -0,0 +1,201 @@
+import orjson
+import logging
+import sqlalchemy as sa
+
+from datetime import datetime, timedelta, timezone
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+from src.s3.config import storage_config
+from src.s3.models import S3Outbox
+from src.s3.types import OrphanReport
+from src.s3.utils import (
+    delete_objects_from_s3,
+    get_objs_metadata_from_s3,
+    list_objects_from_s3
+)
+from src.admin.config import admin_config
+from src.admin.utils import image_variant_key
+from src.products.models import ProductImage
+from src.articles.models import ArticleImage
+
+logger = logging.getLogger("s3")
+
+ORPHAN_REPORT_KEY = "s3:orphan-report"
+
+VERIFY_ACTIONS = {
+    "verify_product_image": ProductImage,
+    "verify_article_image": ArticleImage
+}
+
+
+async def enqueue_s3_deletes(
+        conn: AsyncConnection | AsyncSession,
+        keys: list[str]
+) -> None:
+    """
+    Called inside the transaction which removes the rows
+    referencing keys, the objects are deleted after commit.
+    """
+    if keys:
+        await conn.execute(
+            sa.insert(S3Outbox),
+            [{"key": key, "action": "delete"} for key in keys]
+        )
+
+
+async def enqueue_upload_checks(
+        conn: AsyncConnection | AsyncSession,
+        keys: list[str],
+        action: str
+) -> None:
+    """
+    Called inside the transaction which inserts image rows whose
+    objects are uploaded after commit, rows of uploads which never
+    arrived are removed after UPLOAD_VERIFY_DELAY_SEC.
+    """
+    if keys:
+        available_at = datetime.now(timezone.utc) + timedelta(seconds=storage_config.UPLOAD_VERIFY_DELAY_SEC)
+        await conn.execute(
+            sa.insert(S3Outbox),
+            [{"key": key, "action": action, "available_at": available_at} for key in keys]
+        )
+
+
+async def drain_s3_outbox(
+        session: async_sessionmaker[AsyncSession]
+) -> int:
+    """
+    Processing one batch of due outbox rows, deletes go in a single
+    delete_objects call. Failed rows are retried with a growing delay
+    until OUTBOX_MAX_ATTEMPTS. Rows are locked with SKIP LOCKED so
+    several consumers can drain concurrently. Returns the batch size.
+    """
+    query = (
+        sa.select(S3Outbox.id, S3Outbox.key, S3Outbox.action)
+        .where(
+            sa.and_(
+                S3Outbox.available_at <= sa.func.now(),
+                S3Outbox.attempts < storage_config.OUTBOX_MAX_ATTEMPTS
+            )
+        )
+        .order_by(S3Outbox.id)
+        .limit(storage_config.OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    try:
+        async with session.begin() as conn:
+            rows = (await conn.execute(query)).all()
+            if not rows:
+                return 0
+
+            failed_ids = []
+            delete_rows = [row for row in rows if row.action == "delete"]
+            if delete_rows:
+                try:
+                    failed_keys = set(await delete_objects_from_s3([row.key for row in delete_rows]))
+                except Exception as ex:
+                    logger.warning(ex)
+                    failed_keys = {row.key for row in delete_rows}
+                failed_ids.extend(row.id for row in delete_rows if row.key in failed_keys)
+
+            verify_rows = [row for row in rows if row.action in VERIFY_ACTIONS]
+            uploaded_objects = await get_objs_metadata_from_s3([row.key for row in verify_rows])
+            for row, uploaded_object in zip(verify_rows, uploaded_objects):
+                if isinstance(uploaded_object, BaseException):
+                    logger.warning(uploaded_object)
+                    failed_ids.append(row.id)
+                elif uploaded_object is None:
+                    image_model = VERIFY_ACTIONS[row.action]
+                    logger.warning(f"{row.key} was never uploaded, removing its {image_model.__tablename__} rows.")
+                    await conn.execute(sa.delete(image_model).where(image_model.url==row.key))
+
+            await conn.execute(
+                sa.delete(S3Outbox).where(
+                    S3Outbox.id.in_([row.id for row in rows if row.id not in failed_ids])
+                )
+            )
+            if failed_ids:
+                await conn.execute(
+                    sa.update(S3Outbox).where(S3Outbox.id.in_(failed_ids)).values(
+                        {
+                            S3Outbox.attempts: S3Outbox.attempts + 1,
+                            S3Outbox.available_at: sa.func.now() + (S3Outbox.attempts + 1) * timedelta(
+                                seconds=storage_config.OUTBOX_RETRY_BACKOFF_SEC
+                            )
+                        }
+                    )
+                )
+    except Exception as ex:
+        logger.warning(ex)
+        return 0
+    return len(rows)
+
+
+async def referenced_keys(
+        session: async_sessionmaker[AsyncSession]
+) -> set[str]:
+    """
+    Every key a row points to, product images with their variants.
+    Rows are streamed with a server side cursor instead of fetched at once.
+    """
+    keys: set[str] = set()
+    async with session() as conn:
+        async for url in await conn.stream_scalars(
+            sa.select(ProductImage.url).execution_options(yield_per=5000)
+        ):
+            keys.add(url)
+            keys.update(image_variant_key(url, variant) for variant in admin_config.IMAGE_VARIANT_SIZES)
+        async for url in await conn.stream_scalars(
+            sa.select(ArticleImage.url).execution_options(yield_per=5000)
+        ):
+            keys.add(url)
+    return keys
+
+
+async def collect_orphaned_objects(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        dry_run: bool = True
+) -> OrphanReport:
+    """
+    Walking the bucket listing page by page and deleting objects no row
+    references which are older than ORPHAN_GRACE_PERIOD_SEC, one
+    delete_objects call per page. Processed guaranty spreadsheets are
+    never referenced, so they are collected too. dry_run only reports.
+    The report is kept in redis for /admin/s3-orphans-report/.
+    """
+    keys = await referenced_keys(session=session)
+    grace_limit = datetime.now(timezone.utc) - timedelta(seconds=storage_config.ORPHAN_GRACE_PERIOD_SEC)
+    report: OrphanReport = {
+        "dry_run": dry_run,
+        "scanned": 0,
+        "orphans": 0,
+        "orphan_bytes": 0,
+        "deleted": 0,
+        "sample_keys": [],
+        "finished_at": datetime.now(timezone.utc)
+    }
+    async for page in list_objects_from_s3():
+        report["scanned"] += len(page)
+        orphans = [
+            obj for obj in page
+            if obj["Key"] not in keys and obj["LastModified"] < grace_limit
+        ]
+        if not orphans:
+            continue
+        report["orphans"] += len(orphans)
+        report["orphan_bytes"] += sum(obj["Size"] for obj in orphans)
+        report["sample_keys"].extend(obj["Key"] for obj in orphans[:100 - len(report["sample_keys"])])
+        if not dry_run:
+            failed_keys = await delete_objects_from_s3([obj["Key"] for obj in orphans])
+            report["deleted"] += len(orphans) - len(failed_keys)
+    report["finished_at"] = datetime.now(timezone.utc)
+    logger.info(report)
+    await redis.set(ORPHAN_REPORT_KEY, orjson.dumps(report))
+    return report
+
+
+async def last_orphan_report(redis: Redis) -> OrphanReport | None:
+    report = await redis.get(ORPHAN_REPORT_KEY)
+    return orjson.loads(report) if report else None
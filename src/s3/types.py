@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import NewType, TypedDict
+
+# ==================== Models types ==================== #
+
+OutboxId = NewType("OutboxId", int)
+
+# ==================== Query result types ==================== #
+
+class OrphanReport(TypedDict):
+    dry_run: bool
+    scanned: int
+    orphans: int
+    orphan_bytes: int
+    deleted: int
+    sample_keys: list[str]
+    finished_at: datetime
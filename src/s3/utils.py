@@ -1,7 +1,11 @@
+import os
+import asyncio
 import logging
 
-from typing import BinaryIO
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, BinaryIO
 from aiobotocore.session import get_session # type: ignore
+from botocore.exceptions import ClientError # type: ignore
 
 from src.s3.config import storage_config
 
@@ -9,6 +13,9 @@ logger = logging.getLogger("s3")
 
 async def upload_to_s3(file: BinaryIO, unique_filename: str) -> None:
     logging.info("Start uploading files to s3")
+    file.seek(0, os.SEEK_END)
+    file_size = file.tell()
+    file.seek(0)
     session = get_session()
     async with session.create_client(
         "s3",
@@ -16,12 +23,68 @@ async def upload_to_s3(file: BinaryIO, unique_filename: str) -> None:
         aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
         aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
     ) as client:
-        await client.put_object(
+        if file_size > storage_config.MULTIPART_THRESHOLD:
+            await multipart_upload(client=client, file=file, unique_filename=unique_filename)
+        else:
+            await client.put_object(
+                Bucket=storage_config.BUCKET_NAME,
+                Key=unique_filename,
+                Body=file
+            )
+    logging.info("Finish uploading files to s3")
+
+
+async def multipart_upload(client: Any, file: BinaryIO, unique_filename: str) -> None:
+    """
+    Reading the file part by part and uploading up to MULTIPART_CONCURRENCY
+    parts at once, so at most that many parts are held in memory.
+    """
+    upload = await client.create_multipart_upload(
+        Bucket=storage_config.BUCKET_NAME,
+        Key=unique_filename
+    )
+    semaphore = asyncio.Semaphore(storage_config.MULTIPART_CONCURRENCY)
+
+    async def upload_part(part_number: int, body: bytes) -> dict[str, Any]:
+        try:
+            response = await client.upload_part(
+                Bucket=storage_config.BUCKET_NAME,
+                Key=unique_filename,
+                UploadId=upload["UploadId"],
+                PartNumber=part_number,
+                Body=body
+            )
+        finally:
+            semaphore.release()
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    tasks: list[asyncio.Task] = []
+    try:
+        part_number = 1
+        while True:
+            await semaphore.acquire()
+            if not (body := file.read(storage_config.MULTIPART_PART_SIZE)):
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(upload_part(part_number, body)))
+            part_number += 1
+        parts = await asyncio.gather(*tasks)
+        await client.complete_multipart_upload(
             Bucket=storage_config.BUCKET_NAME,
             Key=unique_filename,
-            Body=file
+            UploadId=upload["UploadId"],
+            MultipartUpload={"Parts": parts}
         )
-    logging.info("Finish uploading files to s3")
+    except Exception as ex:
+        logger.warning(ex)
+        for task in tasks:
+            task.cancel()
+        await client.abort_multipart_upload(
+            Bucket=storage_config.BUCKET_NAME,
+            Key=unique_filename,
+            UploadId=upload["UploadId"]
+        )
+        raise
 
 
 async def delete_from_s3(filename: str):
@@ -40,6 +103,130 @@ async def delete_from_s3(filename: str):
     logging.info("Finish deleting files from s3")
 
 
+async def list_objects_from_s3() -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Yielding the bucket listing page by page (up to 1000 objects each).
+    """
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=storage_config.S3_ENDPOINT,
+        aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
+    ) as client:
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=storage_config.BUCKET_NAME):
+            yield page.get("Contents", [])
+
+
+async def delete_objects_from_s3(filenames: list[str]) -> list[str]:
+    """
+    Deleting up to 1000 objects in one request,
+    returns the keys s3 failed to delete.
+    """
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=storage_config.S3_ENDPOINT,
+        aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
+    ) as client:
+        response = await client.delete_objects(
+            Bucket=storage_config.BUCKET_NAME,
+            Delete={
+                "Objects": [{"Key": filename} for filename in filenames],
+                "Quiet": True
+            }
+        )
+    for error in response.get("Errors", []):
+        logger.warning(f"{error['Key']}: {error['Code']} {error['Message']}")
+    return [error["Key"] for error in response.get("Errors", [])]
+
+
+async def generate_presigned_upload(
+        unique_filename: str,
+        content_type: str,
+        max_size: int
+) -> dict[str, Any]:
+    """
+    Presigned POST letting the client upload straight to s3,
+    s3 rejects bodies over max_size bytes or with another content type.
+    """
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=storage_config.S3_ENDPOINT,
+        aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
+    ) as client:
+        return await client.generate_presigned_post(
+            Bucket=storage_config.BUCKET_NAME,
+            Key=unique_filename,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size]
+            ],
+            ExpiresIn=storage_config.PRESIGNED_URL_TTL_SEC
+        )
+
+
+async def head_object_metadata(client: Any, filename: str) -> dict[str, Any] | None:
+    try:
+        response = await client.head_object(
+            Bucket=storage_config.BUCKET_NAME,
+            Key=filename
+        )
+    except ClientError as ex:
+        if ex.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+            raise
+        return None
+    return {
+        "content_length": response["ContentLength"],
+        "content_type": response.get("ContentType")
+    }
+
+
+async def get_obj_metadata_from_s3(filename: str) -> dict[str, Any] | None:
+    """
+    Size and content type of an object, None when it doesn't exist.
+    """
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=storage_config.S3_ENDPOINT,
+        aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
+    ) as client:
+        return await head_object_metadata(client=client, filename=filename)
+
+
+async def get_objs_metadata_from_s3(
+        filenames: list[str]
+) -> list[dict[str, Any] | None | BaseException]:
+    """
+    Metadata of many objects over one client, at most
+    METADATA_CONCURRENCY requests at once. Failed lookups
+    are returned in place of their metadata.
+    """
+    semaphore = asyncio.Semaphore(storage_config.METADATA_CONCURRENCY)
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=storage_config.S3_ENDPOINT,
+        aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
+    ) as client:
+        async def head(filename: str) -> dict[str, Any] | None:
+            async with semaphore:
+                return await head_object_metadata(client=client, filename=filename)
+
+        return await asyncio.gather(
+            *[head(filename) for filename in filenames],
+            return_exceptions=True
+        )
+
+
 async def get_obj_from_s3(filename: str) -> BinaryIO:
     logging.info("Start getting file from s3")
     session = get_session()
@@ -57,3 +244,44 @@ async def get_obj_from_s3(filename: str) -> BinaryIO:
             file_content = await stream.read()
             return file_content
     logging.info("Finish getting file from s3")
+
+
+async def stream_obj_from_s3(
+        filename: str,
+        start: int | None = None,
+        end: int | None = None
+) -> AsyncIterator[bytes]:
+    """
+    Yielding the object in DOWNLOAD_CHUNK_SIZE chunks, start/end
+    (inclusive) fetch only that byte range of it.
+    """
+    session = get_session()
+    async with session.create_client(
+        "s3",
+        endpoint_url=storage_config.S3_ENDPOINT,
+        aws_access_key_id=storage_config.STORAGE_ACCESS_KEY,
+        aws_secret_access_key=storage_config.STORAGE_SECRET_KEY,
+    ) as client:
+        extra = dict()
+        if start is not None or end is not None:
+            extra["Range"] = f"bytes={start or 0}-{'' if end is None else end}"
+        response = await client.get_object(
+            Bucket=storage_config.BUCKET_NAME,
+            Key=filename,
+            **extra
+        )
+        async with response["Body"] as stream:
+            while chunk := await stream.read(storage_config.DOWNLOAD_CHUNK_SIZE):
+                yield chunk
+
+
+async def download_to_spooled_file(filename: str) -> BinaryIO:
+    """
+    Object in a temp file which stays in memory up to SPOOLED_FILE_MAX_SIZE
+    and rolls over to disk after that, rewound for reading.
+    """
+    file = SpooledTemporaryFile(max_size=storage_config.SPOOLED_FILE_MAX_SIZE)
+    async for chunk in stream_obj_from_s3(filename=filename):
+        file.write(chunk)
+    file.seek(0)
+    return file # type: ignore
@@ -0,0 +1,9 @@
+from pydantic_settings import BaseSettings
+
+
+class SalesConfig(BaseSettings):
+    IDEMPOTENCY_KEY_TTL_SEC: int = 86400
+    RESERVATION_TTL_SEC: int = 600
+    STOCK_RECONCILE_INTERVAL_SEC: int = 30
+
+sales_config = SalesConfig() # type: ignore
@@ -0,0 +1,19 @@
+from fastapi import HTTPException, status
+
+
+class EmptyCart(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Cart is empty!"
+
+
+class OutOfStock(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_409_CONFLICT
+        self.detail = "Some products of the cart are out of stock!"
+
+
+class CheckoutFailed(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Checkout didn't completed successfully, try again!"
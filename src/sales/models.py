@@ -16,6 +16,7 @@ class Sale(Base):
     __tablename__ = "sales"
     __table_args__ = (
         sa.CheckConstraint("total_quantity >= 1", name="total_quantity_check"),
+        sa.UniqueConstraint("user_id", "idempotency_key"),
     )
 
     id: so.Mapped[types.SaleId] = so.mapped_column(autoincrement=True, primary_key=True)
@@ -24,6 +25,7 @@ class Sale(Base):
     created_at: so.Mapped[datetime] = so.mapped_column(
         sa.TIMESTAMP(timezone=True), server_default=sa.func.now()
     )
+    idempotency_key: so.Mapped[str | None] = so.mapped_column(sa.String(100))
 
     user_id: so.Mapped[UserId | None] = so.mapped_column(sa.ForeignKey(
         f"{User.__tablename__}.id", ondelete="SET NULL"
@@ -37,6 +39,7 @@ class SaleProduct(Base):
     __tablename__ = "sale_products"
     __table_args__ = (
         sa.PrimaryKeyConstraint("sale_id", "product_id"),
+        sa.CheckConstraint("quantity >= 1", name="check_positive_quantity"),
     )
 
     sale_id: so.Mapped[types.SaleId] = so.mapped_column(sa.ForeignKey(
@@ -45,6 +48,8 @@ class SaleProduct(Base):
     product_id: so.Mapped[ProductId] = so.mapped_column(sa.ForeignKey(
         f"{Product.__tablename__}.id", ondelete=""
     ))
+    quantity: so.Mapped[int]
+    price: so.Mapped[Decimal] = so.mapped_column(sa.DECIMAL(20, 3))
 
     def __repr__(self) -> str:
         return f"sale_id: {self.sale_id}, product_id: {self.product_id}"
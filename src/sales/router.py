@@ -0,0 +1,52 @@
+from redis.asyncio import Redis
+from typing import Annotated
+from fastapi import APIRouter, status, Depends, Header
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database import get_session, get_redis
+from src.sales import service
+from src.sales.schemas import SaleOut
+from src.sales.types import SaleResponse
+from src.auth.models import User
+from src.auth.dependencies import get_current_active_user
+
+router = APIRouter()
+
+
+@router.post(
+    "/checkout/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=SaleOut,
+    description="Send a unique Idempotency-Key header for safely retrying checkouts."
+)
+async def checkout(
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    user: Annotated[User, Depends(get_current_active_user)],
+    idempotency_key: Annotated[
+        str | None, Header(alias="Idempotency-Key", max_length=100)
+    ] = None
+) -> SaleResponse:
+    return await service.checkout(
+        session=session,
+        redis=redis,
+        user_id=user.id,
+        idempotency_key=idempotency_key
+    )
+
+
+@router.post(
+    "/reserve/",
+    status_code=status.HTTP_204_NO_CONTENT,
+    description="Holds stock of the cart products until checkout or reservation expiry."
+)
+async def reserve_cart(
+    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    user: Annotated[User, Depends(get_current_active_user)]
+) -> None:
+    await service.reserve_cart(
+        session=session,
+        redis=redis,
+        user_id=user.id
+    )
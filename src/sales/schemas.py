@@ -0,0 +1,12 @@
+from typing import Annotated
+from pydantic import Field
+from decimal import Decimal
+
+from src.schemas import CustomBaseModel
+from src.sales.types import SaleId
+
+
+class SaleOut(CustomBaseModel):
+    id: SaleId
+    total_quantity: Annotated[int, Field(alias="totalQuantity")]
+    total_price: Annotated[Decimal, Field(alias="totalPrice")]
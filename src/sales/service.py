@@ -0,0 +1,343 @@
+import json
+import time
+import logging
+import sqlalchemy as sa
+
+from uuid import UUID
+from redis.asyncio import Redis
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.sales import exceptions
+from src.sales.config import sales_config
+from src.sales.models import Sale, SaleProduct
+from src.sales.types import SaleId, SaleResponse
+from src.auth.types import UserId
+from src.cart.models import Cart, CartProduct
+from src.cart.service import cart_key, load_cart
+from src.products.models import Product
+
+logger = logging.getLogger("sales")
+
+RESERVATIONS_KEY = "stock-reservations"
+
+# stock:<product_id> mirrors Product.stock and reserved:<product_id> counts
+# the units held by unexpired reservations, so available = stock - reserved.
+# Any previous reservation of the user is released, then all items are
+# checked before anything is reserved so a reservation is all or nothing.
+# Returns {1} on success, {0, ids...} for products which are not mirrored
+# yet and {-1, ids...} for products without enough available stock.
+RESERVE_STOCK_SCRIPT = """
+local previous = redis.call("HGETALL", KEYS[1])
+for i = 1, #previous, 2 do
+    redis.call("DECRBY", "reserved:" .. previous[i], previous[i + 1])
+end
+redis.call("DEL", KEYS[1])
+redis.call("ZREM", KEYS[2], ARGV[1])
+
+local missing = {0}
+local insufficient = {-1}
+for i = 3, #ARGV, 2 do
+    local stock = redis.call("GET", "stock:" .. ARGV[i])
+    if not stock then
+        table.insert(missing, ARGV[i])
+    else
+        local reserved = tonumber(redis.call("GET", "reserved:" .. ARGV[i]) or "0")
+        if tonumber(stock) - reserved < tonumber(ARGV[i + 1]) then
+            table.insert(insufficient, ARGV[i])
+        end
+    end
+end
+if #missing > 1 then
+    return missing
+end
+if #insufficient > 1 then
+    return insufficient
+end
+
+for i = 3, #ARGV, 2 do
+    redis.call("INCRBY", "reserved:" .. ARGV[i], ARGV[i + 1])
+    redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call("ZADD", KEYS[2], ARGV[2], ARGV[1])
+return {1}
+"""
+
+# Gives the reserved units back. When ARGV[2] is "1" the reservation was
+# turned into a sale, so the units are removed from the stock mirror too.
+RELEASE_STOCK_SCRIPT = """
+if ARGV[3] ~= "" then
+    local expires_at = redis.call("ZSCORE", KEYS[2], ARGV[1])
+    if not expires_at or tonumber(expires_at) > tonumber(ARGV[3]) then
+        return -1
+    end
+end
+local items = redis.call("HGETALL", KEYS[1])
+for i = 1, #items, 2 do
+    redis.call("DECRBY", "reserved:" .. items[i], items[i + 1])
+    if ARGV[2] == "1" and redis.call("EXISTS", "stock:" .. items[i]) == 1 then
+        redis.call("DECRBY", "stock:" .. items[i], items[i + 1])
+    end
+end
+redis.call("DEL", KEYS[1])
+redis.call("ZREM", KEYS[2], ARGV[1])
+return #items / 2
+"""
+
+
+def reservation_key(user_id: UserId | str) -> str:
+    return f"reservation:user_id:{user_id}"
+
+
+async def get_sale_by_idempotency_key(
+        session: async_sessionmaker[AsyncSession],
+        user_id: UserId,
+        idempotency_key: str
+) -> SaleResponse | None:
+    query = sa.select(Sale.id, Sale.total_quantity, Sale.total_price).where(
+        sa.and_(
+            Sale.user_id==user_id,
+            Sale.idempotency_key==idempotency_key
+        )
+    )
+    async with session.begin() as conn:
+        sale = (await conn.execute(query)).first()
+    if sale is None:
+        return None
+    return {
+        "id": sale.id,
+        "total_quantity": sale.total_quantity,
+        "total_price": sale.total_price
+    }
+
+
+async def checkout(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        user_id: UserId,
+        idempotency_key: str | None
+) -> SaleResponse:
+    """
+    Turning the user's cart into a sale in one transaction.
+    Stock of all cart products is decremented with a single
+    UPDATE ... FROM (VALUES ...) WHERE stock >= quantity RETURNING,
+    if any of them is not returned the whole transaction rolls back.
+    The rows are locked in id order first, so concurrent checkouts of
+    overlapping carts wait for each other instead of deadlocking.
+    """
+    idempotency_cache_key = f"checkout:{user_id}:{idempotency_key}"
+    if idempotency_key and (cached_sale := await redis.get(idempotency_cache_key)):
+        return json.loads(cached_sale)
+
+    items = await load_cart(session=session, redis=redis, user_id=user_id)
+    if not items:
+        if idempotency_key and (
+            sale_in_db := await get_sale_by_idempotency_key(
+                session=session, user_id=user_id, idempotency_key=idempotency_key
+            )
+        ):
+            return sale_in_db
+        raise exceptions.EmptyCart
+
+    await reserve_stock(session=session, redis=redis, user_id=user_id, items=items)
+    cart_items = sa.values(
+        sa.column("product_id", sa.UUID),
+        sa.column("quantity", sa.Integer),
+        name="cart_items"
+    ).data([(UUID(product_id), int(quantity)) for product_id, quantity in items.items()])
+    lock_query = (
+        sa.select(Product.id)
+        .where(Product.id.in_([UUID(product_id) for product_id in items]))
+        .order_by(Product.id)
+        .with_for_update()
+    )
+    decrement_stock_query = (
+        sa.update(Product)
+        .where(
+            sa.and_(
+                Product.id==cart_items.c.product_id,
+                Product.stock >= cart_items.c.quantity,
+                Product.is_active.is_(True)
+            )
+        )
+        .values({Product.stock: Product.stock - cart_items.c.quantity})
+        .returning(
+            Product.id,
+            cart_items.c.quantity,
+            Product.effective_price.label("price")
+        )
+    )
+    try:
+        async with session.begin() as conn:
+            await conn.execute(lock_query)
+            sold_products = (await conn.execute(decrement_stock_query)).all()
+            if len(sold_products) != len(items):
+                raise exceptions.OutOfStock
+            total_quantity = sum(product.quantity for product in sold_products)
+            total_price = sum(product.price * product.quantity for product in sold_products)
+            sale_query = sa.insert(Sale).values(
+                {
+                    Sale.user_id: user_id,
+                    Sale.total_quantity: total_quantity,
+                    Sale.total_price: total_price,
+                    Sale.idempotency_key: idempotency_key
+                }
+            ).returning(Sale.id)
+            sale_id: SaleId = await conn.scalar(sale_query)
+            await conn.execute(
+                sa.insert(SaleProduct),
+                [
+                    {
+                        "sale_id": sale_id,
+                        "product_id": product.id,
+                        "quantity": product.quantity,
+                        "price": product.price
+                    } for product in sold_products
+                ]
+            )
+            await conn.execute(
+                sa.delete(CartProduct).where(
+                    CartProduct.cart_id.in_(sa.select(Cart.id).where(Cart.user_id==user_id))
+                )
+            )
+            await conn.execute(
+                sa.update(Cart).where(Cart.user_id==user_id).values(
+                    {
+                        Cart.total_quantity: 0,
+                        Cart.total_price: 0
+                    }
+                )
+            )
+    except exceptions.OutOfStock as ex:
+        logger.warning(ex)
+        await release_stock(redis=redis, user_id=user_id)
+        raise exceptions.OutOfStock
+    except IntegrityError as ex:
+        logger.warning(ex)
+        await release_stock(redis=redis, user_id=user_id)
+        if idempotency_key and "uq_sales_user_id" in str(ex):
+            if sale_in_db := await get_sale_by_idempotency_key(
+                session=session, user_id=user_id, idempotency_key=idempotency_key
+            ):
+                return sale_in_db
+        raise exceptions.CheckoutFailed
+    except DBAPIError as ex:
+        logger.warning(ex)
+        await release_stock(redis=redis, user_id=user_id)
+        raise exceptions.CheckoutFailed
+
+    sale: SaleResponse = {
+        "id": sale_id,
+        "total_quantity": total_quantity,
+        "total_price": total_price
+    }
+    await release_stock(redis=redis, user_id=user_id, sold=True)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hdel(cart_key(user_id), *items)
+        if idempotency_key:
+            pipe.set(
+                name=idempotency_cache_key,
+                value=json.dumps(sale, default=str),
+                ex=sales_config.IDEMPOTENCY_KEY_TTL_SEC
+            )
+        await pipe.execute()
+    return sale
+
+# ==================== Reservation service ==================== #
+
+async def mirror_stocks(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        product_ids: list[str] | None = None
+) -> None:
+    """
+    Copying Product.stock into stock:<product_id> keys, all
+    active products when product_ids is not provided.
+    """
+    query = sa.select(Product.id, Product.stock).where(Product.is_active.is_(True))
+    if product_ids is not None:
+        query = query.where(
+            Product.id==sa.any_(sa.bindparam(
+                "ids",
+                [UUID(product_id) for product_id in product_ids],
+                type_=ARRAY(sa.UUID)
+            ))
+        )
+    try:
+        async with session.begin() as conn:
+            result = (await conn.execute(query)).all()
+    except Exception as ex:
+        logger.warning(ex)
+        return
+    if result:
+        await redis.mset({f"stock:{product.id}": product.stock for product in result})
+
+
+async def reserve_stock(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        user_id: UserId,
+        items: dict[str, str]
+) -> None:
+    reserve_stock_script = redis.register_script(RESERVE_STOCK_SCRIPT)
+    args: list[str | int | float] = [user_id, time.time() + sales_config.RESERVATION_TTL_SEC]
+    for product_id, quantity in items.items():
+        args.extend([product_id, quantity])
+    keys = [reservation_key(user_id), RESERVATIONS_KEY]
+
+    result = await reserve_stock_script(keys=keys, args=args)
+    if result[0] == 0:
+        await mirror_stocks(session=session, redis=redis, product_ids=result[1:])
+        result = await reserve_stock_script(keys=keys, args=args)
+    if result[0] != 1:
+        raise exceptions.OutOfStock
+
+
+async def release_stock(
+        redis: Redis,
+        user_id: UserId | str,
+        sold: bool = False,
+        expired_before: float | None = None
+) -> None:
+    """
+    With expired_before, the reservation is only released if it still
+    expires by then. The check runs inside the script, so a user who
+    reserved again since the expired ones were read keeps the new one.
+    """
+    release_stock_script = redis.register_script(RELEASE_STOCK_SCRIPT)
+    await release_stock_script(
+        keys=[reservation_key(user_id), RESERVATIONS_KEY],
+        args=[user_id, 1 if sold else 0, "" if expired_before is None else expired_before]
+    )
+
+
+async def reserve_cart(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        user_id: UserId
+) -> None:
+    items = await load_cart(session=session, redis=redis, user_id=user_id)
+    if not items:
+        raise exceptions.EmptyCart
+    try:
+        await reserve_stock(session=session, redis=redis, user_id=user_id, items=items)
+    except exceptions.OutOfStock as ex:
+        logger.warning(ex)
+        raise exceptions.OutOfStock
+
+
+async def reconcile_stocks(
+        session: async_sessionmaker[AsyncSession],
+        redis: Redis
+) -> None:
+    """
+    Releasing expired reservations and re-mirroring Product.stock.
+    The db decrement in checkout stays the source of truth, a mirror
+    which is briefly stale only lets a checkout reach the db and fail there.
+    """
+    now = time.time()
+    expired_user_ids = await redis.zrangebyscore(RESERVATIONS_KEY, "-inf", now)
+    for user_id in expired_user_ids:
+        await release_stock(redis=redis, user_id=user_id, expired_before=now)
+    await mirror_stocks(session=session, redis=redis)
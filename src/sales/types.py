@@ -1,3 +1,11 @@
-from typing import NewType
+from typing import NewType, TypedDict
+from decimal import Decimal
 
 SaleId = NewType("SaleId", int)
+
+# ==================== Query result types ==================== #
+
+class SaleResponse(TypedDict):
+    id: SaleId
+    total_quantity: int
+    total_price: Decimal
@@ -1,7 +1,7 @@
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
-from datetime import datetime
+from datetime import date, datetime
 
 from src.database import Base
 from src.tickets.types import TicketId
@@ -40,4 +40,17 @@ class Ticket(Base):
         return f"{self.id}"
 
 
+class TicketRatingRollup(Base):
+    """
+    Number of tickets of a UTC day giving a category each rating, kept
+    in step with ticket writes so stats never scan the tickets table.
+    """
+    __tablename__ = "ticket_rating_rollups"
 
+    day: so.Mapped[date] = so.mapped_column(sa.Date, primary_key=True)
+    category: so.Mapped[str] = so.mapped_column(sa.String(50), primary_key=True)
+    rating: so.Mapped[int] = so.mapped_column(sa.SmallInteger, primary_key=True)
+    ticket_count: so.Mapped[int] = so.mapped_column(default=0, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"{self.day} {self.category} {self.rating}"
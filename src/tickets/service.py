@@ -1,15 +1,58 @@
 import logging
 import sqlalchemy as sa
+import sqlalchemy.orm as so
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from datetime import timezone
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgres_insert
 
 from src.tickets import schemas
-from src.tickets.models import Ticket
+from src.tickets.models import Ticket, TicketRatingRollup
+from src.tickets.types import TicketRatingCategory
 from src.tickets import exceptions
 
 logger = logging.getLogger("tickets")
 
+RATING_COLUMNS: dict[TicketRatingCategory, so.InstrumentedAttribute[int]] = {
+    "guaranty": Ticket.guaranty_rating,
+    "repairs": Ticket.repairs_rating,
+    "notification": Ticket.notification_rating,
+    "personal_behavior": Ticket.personal_behavior_rating,
+    "services": Ticket.services_rating,
+    "smart_process": Ticket.smart_process_rating
+}
+
+
+async def apply_rating_rollup(
+        conn: AsyncConnection,
+        ticket: Row,
+        delta: int
+) -> None:
+    """
+    Adding delta (1 on create, -1 on delete) to the rollups of the
+    ticket's day, for a row returning created_at and every rating.
+    """
+    day = ticket.created_at.astimezone(timezone.utc).date()
+    query = postgres_insert(TicketRatingRollup).values(
+        [
+            {
+                "day": day,
+                "category": category,
+                "rating": getattr(ticket, column.key),
+                "ticket_count": delta
+            } for category, column in RATING_COLUMNS.items()
+        ]
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[
+            TicketRatingRollup.day, TicketRatingRollup.category, TicketRatingRollup.rating
+        ],
+        set_={TicketRatingRollup.ticket_count: TicketRatingRollup.ticket_count + query.excluded.ticket_count}
+    )
+    await conn.execute(query)
+
 
 async def create_ticket(
         session: async_sessionmaker[AsyncSession],
@@ -29,10 +72,11 @@ async def create_ticket(
             Ticket.criticism: payload.criticism,
             Ticket.call_request: payload.call_request
         }
-    )
+    ).returning(Ticket.created_at, *RATING_COLUMNS.values())
     try:
         async with session.begin() as conn:
-            await conn.execute(query)
+            ticket = (await conn.execute(query)).one()
+            await apply_rating_rollup(conn=conn, ticket=ticket, delta=1)
     except IntegrityError as ex:
         logger.warning(ex)
         raise exceptions.TicketCreateException
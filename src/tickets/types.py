@@ -1,3 +1,12 @@
-from typing import NewType
+from typing import Literal, NewType
 
 TicketId = NewType("TicketId", int)
+# Rating columns of Ticket without the _rating suffix.
+TicketRatingCategory = Literal[
+    "guaranty",
+    "repairs",
+    "notification",
+    "personal_behavior",
+    "services",
+    "smart_process"
+]